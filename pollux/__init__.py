@@ -1,86 +1,231 @@
-from datetime import date as makedate
+from bisect import bisect_right
+from datetime import date as makedate, timedelta
+from itertools import groupby
+from os.path import dirname, join
 from re import compile
 from time import strptime
 from urllib.parse import urlencode
 import logging
 
-from bs4 import BeautifulSoup
-
-from .data import THRESHOLDS
+from .cache import index_by_date
+from .classifier import default as default_classifier
+from .frame import GENUS_CODES, GENUS_NAMES, PollenFrame, genus_code
+from .metrics import active as active_metrics
 from .model import SymptomStrength, Datum
+from .parsing import extract_rows
 
 P_LNAME = compile(r'\((.*?)\)')
+BASE_URL = 'http://www.pollen.lu/index.php'
 LOG = logging.getLogger(__name__)
 
+with open(join(dirname(__file__), 'version.txt')) as fptr:
+    __version__ = fptr.read().strip()
+
+
+def parse(data, engine=None):
+    '''
+    Parse a pollen.lu data page into a set of :py:class:`Datum` instances.
 
-def parse(data):
+    *engine* selects the backend extracting the table cells (see
+    :py:data:`pollux.parsing.ENGINES`).
+    '''
     output = set()
     if not data:
         return output
-    soup = BeautifulSoup(data, 'html.parser')
-    tables = soup.find_all('table')
-    rows = tables[5].find_all('tr')
-    dates_row = rows[1]
-    data = rows[2:]
-    dates = [makedate(*strptime(cell.text, '%Y-%m-%d')[0:3])
-             for cell in dates_row.find_all('td')[1:]]
-    for row in data:
-        cells = row.find_all('td')
-        lname = P_LNAME.findall(cells[0].text)[0]
-        values = [int(cell.text) for cell in cells[1:]]
-        for date, value in zip(dates, values):
-            output.add(Datum(date, lname, value))
-    LOG.debug('Retrieved data: %r', output)
+    with active_metrics().timer('pollux_parse_seconds'):
+        output.update(iter_parse(data, engine))
+    LOG.debug('Retrieved %d data points', len(output))
     return output
 
 
+def iter_parse(data, engine=None):
+    '''
+    Like :py:func:`parse` but yields the :py:class:`Datum` instances one by
+    one, genus after genus, instead of collecting them in a set.
+    '''
+    if not data:
+        return
+    rows = extract_rows(data, engine)
+    dates = [makedate(*strptime(cell, '%Y-%m-%d')[0:3])
+             for cell in rows[1][1:]]
+    for cells in rows[2:]:
+        lname = P_LNAME.findall(cells[0])[0]
+        for date, cell in zip(dates, cells[1:]):
+            yield Datum(date, lname, int(cell))
+
+
 def warnings(data, date):
-    output = {}
+    output = warnings_range(data, [date])[date]
+    LOG.debug('Determined %d warnings.', len(output))
+    return output
+
+
+def warnings_range(data, dates):
+    '''
+    Determine the warnings for many dates in one pass over *data*.
+
+    *data* is either an iterable of :py:class:`Datum` instances or a
+    :py:class:`pollux.frame.PollenFrame`. Returns a dictionary mapping each
+    date in *dates* to the same dictionary :py:func:`warnings` would return
+    for that date.
+    '''
+    with active_metrics().timer('pollux_warnings_seconds'):
+        return _warnings_range(data, dates)
+
+
+def _warnings_range(data, dates):
+    output = {date: {} for date in dates}
+    if not output:
+        return output
+
+    classifier = default_classifier()
+    if isinstance(data, PollenFrame):
+        ordinals = {date.toordinal(): date for date in output}
+        frame = data.select(min(output), max(output))
+        keys, limits, labels = classifier.tables()
+        rows = zip(frame.dates, frame.genera, frame.values)
+        for ordinal, code, value in rows:
+            date = ordinals.get(ordinal)
+            if date is None:
+                continue
+            strength = labels[code][bisect_right(limits[code], value)]
+            if strength is not None:
+                output[date][keys[code]] = strength
+                if strength == SymptomStrength.ERROR:
+                    LOG.warning('Illegal value: %r', Datum(
+                        date, GENUS_NAMES[code], value))
+        return output
+
+    keys, limits, labels = classifier.tables()
     for row in data:
-        if row.date != date:
+        found = output.get(row.date)
+        if found is None:
             continue
-
-        key = row.lname.lower()
-        threshold = THRESHOLDS.get(key)
-        if threshold:
-            if row.value >= threshold.medium:
-                output[key] = SymptomStrength.HIGH
-            elif row.value >= threshold.light:
-                output[key] = SymptomStrength.MEDIUM
-            elif row.value > 0:
-                output[key] = SymptomStrength.LOW
-            elif row.value == 0:
-                LOG.debug('No warning needed for %r', row)
-            else:
-                # value < 0
+        code = GENUS_CODES.get(row.lname.lower())
+        if code is None:
+            code = genus_code(row.lname)
+            keys, limits, labels = classifier.tables()
+        strength = labels[code][bisect_right(limits[code], row.value)]
+        if strength is not None:
+            found[keys[code]] = strength
+            if strength == SymptomStrength.ERROR:
                 LOG.warning('Illegal value: %r', row)
-                output[key] = SymptomStrength.ERROR
-        else:
-            LOG.debug('Key for row %r not found in thresholds!', row)
-            output[key] = SymptomStrength.UNKNOWN
-
-    LOG.debug('Determined %d warnings.', len(output))
     return output
 
 
+def week_key(date):
+    '''
+    Return the ``(year, week)`` key of the pollen.lu page containing *date*.
+
+    The week on pollen.lu starts on a Sunday (``%U``).
+    '''
+    return date.strftime('%Y'), date.strftime('%U')
+
+
+def week_end(key):
+    '''
+    Return the last day of the week identified by the ``(year, week)``
+    *key* (see :py:func:`week_key`), which is a Saturday or the 31st of
+    December.
+    '''
+    year, week = key
+    saturday = makedate(*strptime('%s %s 6' % (year, week), '%Y %U %w')[0:3])
+    return min(saturday, makedate(int(year), 12, 31))
+
+
+def daterange(start, end):
+    '''
+    Yield all dates from *start* to *end* (both inclusive).
+    '''
+    for offset in range((end - start).days + 1):
+        yield start + timedelta(days=offset)
+
+
+def page_url(key, base_url=BASE_URL):
+    '''
+    Return the URL of the pollen.lu data page of the ``(year, week)`` *key*.
+    '''
+    year, week = key
+    data = [
+        ('qsPage', 'data'),
+        ('year', year),
+        ('week', week),
+    ]
+    query = urlencode(data)
+    return base_url + '?' + query
+
+
 class Probe:
+    '''
+    :param httplib: Object providing a ``get(url)`` method returning a
+        response with a ``text`` attribute (for example ``requests``).
+    :param emitlib: The :py:class:`pollux.emitter.Emitter` receiving the data.
+    :param cache: An optional :py:class:`pollux.cache.PollenCache`. Weeks
+        found in the cache are neither downloaded nor parsed again. Only
+        finished weeks are cached (see :py:meth:`is_final`).
+    :param memo: An optional :py:class:`pollux.cache.ParseMemo`. Downloaded
+        pages are not parsed again if their content did not change.
+    :param today: Callable returning the current date.
+    '''
 
-    def __init__(self, httplib, emitlib):
+    def __init__(self, httplib, emitlib, cache=None, memo=None,
+                 today=makedate.today):
         self.httplib = httplib
         self.emitlib = emitlib
+        self.cache = cache
+        self.memo = memo
+        self.today = today
+
+    def url(self, key):
+        return page_url(key)
+
+    def is_final(self, key):
+        '''
+        Return whether the page of the week *key* no longer changes, so that
+        it may be cached.
+        '''
+        return week_end(key) < self.today()
+
+    def fetch(self, key):
+        '''
+        Download and parse the page for the ``(year, week)`` *key*.
+        '''
+        with active_metrics().timer('pollux_probe_http_seconds'):
+            response = self.httplib.get(self.url(key))
+        if self.memo is not None:
+            return self.memo.parse(response.text)
+        return parse(response.text)
+
+    def fetch_week(self, key):
+        '''
+        Return the data of the week *key* indexed by date (see
+        :py:func:`pollux.cache.index_by_date`), using the cache if available.
+        '''
+        if self.cache is None:
+            return index_by_date(self.fetch(key))
+        index = self.cache.get(key)
+        if index is None:
+            data = self.fetch(key)
+            if self.is_final(key):
+                return self.cache.put(key, data)
+            return index_by_date(data)
+        return index
 
     def execute(self, date):
         LOG.debug('Executing probe for %s', date)
-        data = [
-            ('qsPage', 'data'),
-            ('year', date.strftime('%Y')),
-            ('week', date.strftime('%U')),
-        ]
-        query = urlencode(data)
-        url = 'http://www.pollen.lu/index.php?' + query
-        response = self.httplib.get(url)
-
-        data = parse(response.text)
-
-        filtered = {datum for datum in data if datum.date == date}
-        self.emitlib.disseminate(date, filtered)
+        metrics = active_metrics()
+        with metrics.timer('pollux_probe_execute_seconds'):
+            index = self.fetch_week(week_key(date))
+            with metrics.timer('pollux_probe_emit_seconds'):
+                self.emitlib.disseminate(date, set(index.get(date, ())))
+
+    def execute_range(self, start, end):
+        '''
+        Like :py:meth:`execute` but for each date from *start* to *end* (both
+        inclusive). Each week page is only fetched and parsed once.
+        '''
+        LOG.debug('Executing probe from %s to %s', start, end)
+        for key, dates in groupby(daterange(start, end), week_key):
+            index = self.fetch_week(key)
+            for date in dates:
+                self.emitlib.disseminate(date, set(index.get(date, ())))
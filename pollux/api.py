@@ -0,0 +1,303 @@
+'''
+Read-only HTTP query API.
+
+:py:class:`QueryHandler` is an emitter handler keeping the disseminated data
+in memory. When new data arrives it precomputes the JSON document of each
+changed date. :py:class:`QueryAPI` is a WSGI application answering requests
+from these documents only. It never contacts pollen.lu.
+
+Routes (all return JSON):
+
+``/latest``
+    Values and warnings of the most recent date.
+``/dates/<YYYY-MM-DD>``
+    Values and warnings of one date.
+``/range?start=<date>&end=<date>[&genus=<name>...]``
+    List of the documents of all dates from *start* to *end*, optionally
+    limited to some genera.
+``/genera``
+    Names of all genera with data.
+``/genera/<name>[?start=<date>&end=<date>]``
+    Mapping of dates to the values of one genus.
+
+All responses carry an ``ETag`` and a ``Cache-Control`` header and requests
+with a matching ``If-None-Match`` header are answered with ``304 Not
+Modified``.
+'''
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, namedtuple
+from datetime import date as makedate
+from hashlib import blake2b
+from socketserver import ThreadingMixIn
+from threading import Lock
+from urllib.parse import parse_qs, unquote
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+from wsgiref.simple_server import make_server as make_wsgi_server
+import json
+import logging
+
+from . import warnings
+from .model import Datum
+
+LOG = logging.getLogger(__name__)
+
+#: A precomputed response body and its entity tag.
+Response = namedtuple('Response', 'body, etag')
+
+
+class QueryError(ValueError):
+    '''
+    Raised for malformed queries.
+    '''
+
+
+def make_response(document):
+    body = json.dumps(document, sort_keys=True,
+                      separators=(',', ':')).encode('utf8')
+    return Response(body, '"%s"' % blake2b(body, digest_size=12).hexdigest())
+
+
+def parse_date(value):
+    try:
+        return makedate.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise QueryError('Invalid date: %r' % value)
+
+
+class QueryHandler:
+    '''
+    Emitter handler keeping the disseminated values by date and serving them
+    as precomputed JSON documents.
+
+    :param max_cached: Number of range and series responses kept in memory.
+        They are discarded whenever new data arrives.
+
+    The handler may be shared between threads.
+    '''
+
+    def __init__(self, max_cached=1024):
+        self.max_cached = max_cached
+        self.days = {}
+        self.dates = []
+        self.version = 0
+        self._documents = {}
+        self._warnings = {}
+        self._responses = OrderedDict()
+        self._lock = Lock()
+
+    def handle(self, pollen_family, symptom_strength):
+        pass
+
+    def handle_raw_data(self, data):
+        self.load(data['values'])
+
+    def load(self, data):
+        '''
+        Add an iterable of :py:class:`Datum` instances and update the
+        documents of their dates.
+        '''
+        grouped = {}
+        for datum in data:
+            grouped.setdefault(datum.date, {})[datum.lname] = datum.value
+        if not grouped:
+            return
+        with self._lock:
+            for date, values in grouped.items():
+                if date not in self.days:
+                    self.days[date] = {}
+                    self.dates.insert(bisect_left(self.dates, date), date)
+                day = self.days[date]
+                day.update(values)
+                self._warnings[date] = warnings(
+                    {Datum(date, lname, value)
+                     for lname, value in day.items()}, date)
+                self._documents[date] = make_response(
+                    self._document(date))
+            self.version += 1
+            self._responses.clear()
+        LOG.debug('Updated %d dates', len(grouped))
+
+    def _document(self, date, genera=None):
+        values = self.days[date]
+        found = self._warnings[date]
+        if genera is not None:
+            values = {lname: value for lname, value in values.items()
+                      if lname.lower() in genera}
+            found = {key: strength for key, strength in found.items()
+                     if key in genera}
+        return {
+            'date': date.isoformat(),
+            'values': values,
+            'warnings': found,
+        }
+
+    def _cached(self, key, function):
+        with self._lock:
+            response = self._responses.get(key)
+            if response is not None:
+                self._responses.move_to_end(key)
+                return response
+            response = self._responses[key] = function()
+            while len(self._responses) > self.max_cached:
+                self._responses.popitem(last=False)
+        return response
+
+    def _span(self, start, end):
+        low = bisect_left(self.dates, start) if start else 0
+        high = bisect_right(self.dates, end) if end else len(self.dates)
+        return self.dates[low:high]
+
+    def day(self, date):
+        '''
+        Return the :py:class:`Response` of *date* or ``None``.
+        '''
+        return self._documents.get(date)
+
+    def latest(self):
+        '''
+        Return the :py:class:`Response` of the most recent date or ``None``.
+        '''
+        with self._lock:
+            if not self.dates:
+                return None
+            return self._documents[self.dates[-1]]
+
+    def range(self, start=None, end=None, genera=None):
+        '''
+        Return the :py:class:`Response` listing the dates from *start* to
+        *end* (both inclusive), optionally limited to the genus names in
+        *genera*.
+        '''
+        if genera is not None:
+            genera = frozenset(genus.lower() for genus in genera)
+
+        def build():
+            dates = self._span(start, end)
+            if genera is None:
+                body = b'[' + b','.join(
+                    self._documents[date].body for date in dates) + b']'
+                return Response(body, '"%s"' % blake2b(
+                    body, digest_size=12).hexdigest())
+            return make_response([self._document(date, genera)
+                                  for date in dates])
+        return self._cached(('range', start, end, genera), build)
+
+    def genera(self):
+        '''
+        Return the :py:class:`Response` listing the known genus names.
+        '''
+        def build():
+            names = set()
+            for values in self.days.values():
+                names.update(values)
+            return make_response(sorted(names))
+        return self._cached(('genera',), build)
+
+    def series(self, genus, start=None, end=None):
+        '''
+        Return the :py:class:`Response` mapping dates to the values of
+        *genus* or ``None`` if there is no data for it.
+        '''
+        genus = genus.lower()
+
+        def build():
+            output = {}
+            for date in self._span(start, end):
+                for lname, value in self.days[date].items():
+                    if lname.lower() == genus:
+                        output[date.isoformat()] = value
+            return make_response(output) if output else None
+        return self._cached(('series', genus, start, end), build)
+
+
+class QueryAPI:
+    '''
+    WSGI application serving the documents of a :py:class:`QueryHandler`.
+
+    :param handler: The :py:class:`QueryHandler` holding the data.
+    :param max_age: Value of the ``max-age`` directive of the
+        ``Cache-Control`` header, in seconds.
+    '''
+
+    def __init__(self, handler, max_age=300):
+        self.handler = handler
+        self.cache_control = 'public, max-age=%d' % max_age
+
+    def route(self, path, query):
+        '''
+        Return the :py:class:`Response` for *path* and the parsed query
+        string *query* or ``None`` if there is none.
+        '''
+        parts = [unquote(part) for part in path.strip('/').split('/')]
+        start = end = None
+        if 'start' in query:
+            start = parse_date(query['start'][0])
+        if 'end' in query:
+            end = parse_date(query['end'][0])
+
+        if parts == ['latest']:
+            return self.handler.latest()
+        if len(parts) == 2 and parts[0] == 'dates':
+            return self.handler.day(parse_date(parts[1]))
+        if parts == ['range']:
+            genera = None
+            if 'genus' in query:
+                genera = [name for value in query['genus']
+                          for name in value.split(',') if name]
+            return self.handler.range(start, end, genera)
+        if parts == ['genera']:
+            return self.handler.genera()
+        if len(parts) == 2 and parts[0] == 'genera':
+            return self.handler.series(parts[1], start, end)
+        return None
+
+    def __call__(self, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        if method not in ('GET', 'HEAD'):
+            return self.error(start_response, '405 Method Not Allowed',
+                              'Method not allowed',
+                              [('Allow', 'GET, HEAD')])
+        try:
+            response = self.route(environ.get('PATH_INFO', ''),
+                                  parse_qs(environ.get('QUERY_STRING', '')))
+        except QueryError as exc:
+            return self.error(start_response, '400 Bad Request', str(exc))
+        if response is None:
+            return self.error(start_response, '404 Not Found', 'Not found')
+
+        headers = [('ETag', response.etag),
+                   ('Cache-Control', self.cache_control)]
+        if environ.get('HTTP_IF_NONE_MATCH') == response.etag:
+            start_response('304 Not Modified', headers)
+            return []
+        headers.extend([('Content-Type', 'application/json'),
+                        ('Content-Length', str(len(response.body)))])
+        start_response('200 OK', headers)
+        return [] if method == 'HEAD' else [response.body]
+
+    def error(self, start_response, status, message, headers=()):
+        body = json.dumps({'error': message}).encode('utf8')
+        start_response(status, [('Content-Type', 'application/json'),
+                                ('Content-Length', str(len(body))),
+                                ('Cache-Control', 'no-store')] +
+                       list(headers))
+        return [body]
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        LOG.debug('%s - %s', self.address_string(), format % args)
+
+
+def make_server(app, host='127.0.0.1', port=8080):
+    '''
+    Create a threaded HTTP server for the WSGI application *app*. Any other
+    WSGI server can be used to host :py:class:`QueryAPI` as well.
+    '''
+    return make_wsgi_server(host, port, app, ThreadingWSGIServer,
+                            QuietRequestHandler)
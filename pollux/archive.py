@@ -0,0 +1,237 @@
+'''
+Append-only binary archive of pollen counts.
+
+The archive is a single file made of a fixed-size header followed by
+fixed-width records. Each record holds three native 32 bit integers: the day
+ordinal (see :py:meth:`datetime.date.toordinal`), the genus code (the index in
+the sorted :py:data:`pollux.data.GENERA`) and the count. Records are stored in
+chronological order.
+
+The header contains a magic number, the format version, the byte order of
+the writer and the index of the first record of each year between
+:py:data:`FIRST_YEAR` and :py:data:`LAST_YEAR`.
+
+:py:class:`ArchiveReader` maps the file into memory and exposes the three
+columns as :py:class:`memoryview` instances without copying the data.
+'''
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date as makedate
+from mmap import ACCESS_READ, mmap
+from os.path import exists, getsize
+from struct import Struct
+import sys
+
+from . import frame
+from .data import GENERA
+from .model import Datum
+
+MAGIC = b'PLXA'
+VERSION = 1
+FIRST_YEAR = 1900
+LAST_YEAR = 2155
+RECORD_TYPECODE = 'i'
+RECORD_FIELDS = 3
+RECORD_SIZE = array(RECORD_TYPECODE).itemsize * RECORD_FIELDS
+UNSET = 0xFFFFFFFF
+
+#: magic, version, byte order ("l" or "b"), number of year slots
+HEADER = Struct('<4sHcxI')
+YEAR_INDEX = Struct('<%dI' % (LAST_YEAR - FIRST_YEAR + 1))
+HEADER_SIZE = HEADER.size + YEAR_INDEX.size
+
+#: Genus names by code. The archive only supports the genera of
+#: :py:data:`pollux.data.GENERA` so the codes never change.
+GENUS_NAMES = tuple(frame.GENUS_NAMES[:len(GENERA)])
+GENUS_CODES = {name: code for code, name in enumerate(GENUS_NAMES)}
+
+
+class ArchiveError(ValueError):
+    '''
+    Raised for malformed archives and for data which cannot be archived.
+    '''
+
+
+def _read_header(fptr):
+    raw = fptr.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE:
+        raise ArchiveError('Truncated header')
+    magic, version, byteorder, slots = HEADER.unpack_from(raw)
+    if magic != MAGIC or slots != LAST_YEAR - FIRST_YEAR + 1:
+        raise ArchiveError('Not a pollen archive')
+    if version != VERSION:
+        raise ArchiveError('Unsupported archive version %d' % version)
+    if byteorder != sys.byteorder[:1].encode('ascii'):
+        raise ArchiveError('Archive was written with a different byte order')
+    return list(YEAR_INDEX.unpack_from(raw, HEADER.size))
+
+
+class ArchiveWriter:
+    '''
+    Appends :py:class:`Datum` instances to an archive, creating it if
+    necessary. A partial record at the end of an existing archive (left by an
+    interrupted write) is discarded.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        if exists(path) and getsize(path):
+            self.fptr = open(path, 'r+b')
+            self.years = _read_header(self.fptr)
+            self.fptr.seek(0, 2)
+            self.count = (self.fptr.tell() - HEADER_SIZE) // RECORD_SIZE
+            self.fptr.truncate(HEADER_SIZE + self.count * RECORD_SIZE)
+            self.last = self._last_ordinal()
+        else:
+            self.fptr = open(path, 'w+b')
+            self.years = [UNSET] * (LAST_YEAR - FIRST_YEAR + 1)
+            self.count = 0
+            self.last = 0
+            self._write_header()
+
+    def _write_header(self):
+        self.fptr.seek(0)
+        self.fptr.write(HEADER.pack(
+            MAGIC, VERSION, sys.byteorder[:1].encode('ascii'),
+            len(self.years)))
+        self.fptr.write(YEAR_INDEX.pack(*self.years))
+
+    def _last_ordinal(self):
+        if not self.count:
+            return 0
+        self.fptr.seek(HEADER_SIZE + (self.count - 1) * RECORD_SIZE)
+        record = array(RECORD_TYPECODE)
+        record.frombytes(self.fptr.read(RECORD_SIZE))
+        self.fptr.seek(0, 2)
+        return record[0]
+
+    def append(self, data):
+        '''
+        Append an iterable of :py:class:`Datum` instances. All dates must be
+        after the last date already in the archive, so a day can only be
+        archived once, with all its rows.
+        '''
+        try:
+            rows = sorted((datum.date.toordinal(), GENUS_CODES[datum.lname],
+                           datum.value) for datum in data)
+        except KeyError as exc:
+            raise ArchiveError('Unsupported genus: %s' % exc)
+        if not rows:
+            return
+        if rows[0][0] <= self.last:
+            raise ArchiveError('The archive is append-only. Cannot add data '
+                               'on or before %s'
+                               % makedate.fromordinal(self.last))
+
+        records = array(RECORD_TYPECODE)
+        header_changed = False
+        for offset, row in enumerate(rows, self.count):
+            year = makedate.fromordinal(row[0]).year
+            if not FIRST_YEAR <= year <= LAST_YEAR:
+                raise ArchiveError('Year %d out of range' % year)
+            slot = year - FIRST_YEAR
+            if self.years[slot] == UNSET:
+                self.years[slot] = offset
+                header_changed = True
+            records.extend(row)
+        self.fptr.seek(0, 2)
+        records.tofile(self.fptr)
+        self.count += len(rows)
+        self.last = rows[-1][0]
+        if header_changed:
+            self._write_header()
+            self.fptr.seek(0, 2)
+        self.fptr.flush()
+
+    def close(self):
+        self.fptr.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ArchiveReader:
+    '''
+    Read-only, memory-mapped view of an archive.
+
+    The :py:attr:`dates`, :py:attr:`genera` and :py:attr:`values` columns are
+    strided :py:class:`memoryview` instances on the mapped file. They must be
+    released (or dropped) before calling :py:meth:`close`.
+    '''
+
+    def __init__(self, path):
+        with open(path, 'rb') as fptr:
+            self.years = _read_header(fptr)
+            size = fptr.seek(0, 2)
+            self.count = (size - HEADER_SIZE) // RECORD_SIZE
+            if self.count:
+                self._mmap = mmap(fptr.fileno(), 0, access=ACCESS_READ)
+                records = memoryview(self._mmap)[
+                    HEADER_SIZE:HEADER_SIZE + self.count * RECORD_SIZE]
+            else:
+                self._mmap = None
+                records = memoryview(b'')
+        self.records = records.cast(RECORD_TYPECODE)
+        self.dates = self.records[0::RECORD_FIELDS]
+        self.genera = self.records[1::RECORD_FIELDS]
+        self.values = self.records[2::RECORD_FIELDS]
+
+    def year_range(self, year):
+        '''
+        Return the ``(start, end)`` record indices of *year*.
+        '''
+        slot = year - FIRST_YEAR
+        if not 0 <= slot < len(self.years) or self.years[slot] == UNSET:
+            return 0, 0
+        start = self.years[slot]
+        following = [offset for offset in self.years[slot + 1:]
+                     if offset != UNSET]
+        return start, following[0] if following else self.count
+
+    def index_range(self, start=None, end=None):
+        '''
+        Return the ``(start, end)`` record indices of the dates from *start*
+        to *end* (both inclusive).
+        '''
+        low = bisect_left(self.dates, start.toordinal()) if start else 0
+        high = (bisect_right(self.dates, end.toordinal())
+                if end else self.count)
+        return low, high
+
+    def columns(self, start=None, end=None):
+        '''
+        Return the ``(dates, genera, values)`` columns for the dates from
+        *start* to *end* as :py:class:`memoryview` instances (no copy).
+        '''
+        low, high = self.index_range(start, end)
+        return (self.dates[low:high], self.genera[low:high],
+                self.values[low:high])
+
+    def select(self, start=None, end=None):
+        '''
+        Yield the :py:class:`Datum` instances from *start* to *end*.
+        '''
+        fromordinal = makedate.fromordinal
+        for date, genus, value in zip(*self.columns(start, end)):
+            yield Datum(fromordinal(date), GENUS_NAMES[genus], value)
+
+    def __iter__(self):
+        return self.select()
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        for view in (self.dates, self.genera, self.values, self.records):
+            view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,152 @@
+'''
+Concurrent probe for loading large ranges of historical data.
+
+:py:class:`AsyncProbe` fetches many week pages at once using :py:mod:`asyncio`.
+The injected ``httplib`` is the same blocking object used by
+:py:class:`pollux.Probe` (``requests``, a ``requests.Session``,
+:py:class:`pollux.httpcache.HttpCache`, ...). Its calls are run on a bounded
+pool of threads so the event loop is never blocked. Parsing is done on a
+separate executor which may be a process pool.
+'''
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date as makedate
+from functools import partial
+from itertools import groupby
+from urllib.parse import urlparse
+import asyncio
+import logging
+
+from . import Probe, daterange, parse, week_key
+from .cache import index_by_date
+
+LOG = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    '''
+    Ensures that at most *rate* requests per second are started.
+    '''
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = 0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = max(self._next, loop.time()) + self.interval
+
+
+class AsyncProbe(Probe):
+    '''
+    :param httplib: See :py:class:`pollux.Probe`.
+    :param emitlib: See :py:class:`pollux.Probe`.
+    :param concurrency: Maximum number of simultaneous HTTP requests.
+    :param rate: If given, the maximum number of requests per second which
+        are sent to any single host.
+    :param retries: How many times a failed request is retried.
+    :param backoff: Delay (in seconds) before the first retry. The delay is
+        doubled for each subsequent retry.
+    :param executor: The :py:class:`concurrent.futures.Executor` used to
+        parse the pages. Defaults to the event loop's default executor.
+    :param cache: See :py:class:`pollux.Probe`.
+    :param memo: See :py:class:`pollux.Probe`.
+    :param today: See :py:class:`pollux.Probe`.
+    '''
+
+    def __init__(self, httplib, emitlib, concurrency=8, rate=None,
+                 retries=3, backoff=0.5, executor=None, cache=None,
+                 memo=None, today=makedate.today):
+        super().__init__(httplib, emitlib, cache, memo, today)
+        self.concurrency = concurrency
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self.executor = executor
+
+    def _limiter(self, url, limiters):
+        # The limiters hold asyncio locks bound to the running event loop,
+        # so each run of execute_range_async creates its own.
+        host = urlparse(url).netloc
+        if host not in limiters:
+            limiters[host] = RateLimiter(self.rate)
+        return limiters[host]
+
+    async def _get(self, url, pool, semaphore, limiters):
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.retries + 1):
+            async with semaphore:
+                if self.rate:
+                    await self._limiter(url, limiters).wait()
+                try:
+                    response = await loop.run_in_executor(
+                        pool, self.httplib.get, url)
+                    raise_for_status = getattr(
+                        response, 'raise_for_status', None)
+                    if raise_for_status:
+                        raise_for_status()
+                    return response
+                except Exception:
+                    if attempt == self.retries:
+                        raise
+                    delay = self.backoff * 2 ** attempt
+                    LOG.warning('Request to %s failed. Retrying in %.1fs',
+                                url, delay, exc_info=True)
+            await asyncio.sleep(delay)
+
+    async def fetch_async(self, key, pool, semaphore, limiters=None):
+        '''
+        Download and parse the page for the ``(year, week)`` *key*.
+        *limiters* maps host names to the :py:class:`RateLimiter` of the
+        current event loop.
+        '''
+        if limiters is None:
+            limiters = {}
+        response = await self._get(self.url(key), pool, semaphore, limiters)
+        text = response.text
+        if self.memo is not None:
+            memo_key = self.memo.key(text)
+            data = self.memo.get(memo_key)
+            if data is not None:
+                return data
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(self.executor, partial(parse, text))
+        if self.memo is not None:
+            data = self.memo.put(memo_key, data)
+        return data
+
+    async def execute_range_async(self, start, end):
+        '''
+        Fetch all weeks from *start* to *end* (both inclusive) concurrently
+        and disseminate each date as soon as its week has been parsed.
+        '''
+        LOG.debug('Executing async probe from %s to %s', start, end)
+        weeks = [(key, list(dates)) for key, dates in
+                 groupby(daterange(start, end), week_key)]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiters = {}
+
+        async def process(key, dates, pool):
+            index = None
+            if self.cache is not None:
+                index = self.cache.get(key)
+            if index is None:
+                data = await self.fetch_async(key, pool, semaphore,
+                                              limiters)
+                if self.cache is not None and self.is_final(key):
+                    index = self.cache.put(key, data)
+                else:
+                    index = index_by_date(data)
+            for date in dates:
+                self.emitlib.disseminate(date, set(index.get(date, ())))
+
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            await asyncio.gather(*[process(key, dates, pool)
+                                   for key, dates in weeks])
+
+    def execute_range(self, start, end):
+        asyncio.run(self.execute_range_async(start, end))
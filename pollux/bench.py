@@ -0,0 +1,260 @@
+'''
+Benchmarks for the hot paths of pollux.
+
+Run with ``python -m pollux.bench`` (or ``pollux bench``). Each benchmark
+reports its throughput, latency percentiles and peak memory usage. Results can
+be saved as JSON baseline and compared against in later runs::
+
+    python -m pollux.bench --save baseline.json
+    python -m pollux.bench --compare baseline.json
+'''
+from datetime import date, timedelta
+from os.path import dirname, join
+from time import perf_counter
+import json
+import platform
+import sys
+import tracemalloc
+
+from . import Probe, parse, warnings, warnings_range
+from .api import QueryAPI, QueryHandler
+from .classifier import default as default_classifier
+from .emitter import Emitter
+from .forecast import Forecaster
+from .frame import GENUS_NAMES, PollenFrame
+from .model import Datum
+from .stats import PollenStats
+
+#: Folder containing the HTML fixtures used by the tests.
+FIXTURES = join(dirname(__file__), 'test', 'data')
+
+#: A benchmark is a regression if its median latency grows by this factor.
+DEFAULT_TOLERANCE = 1.25
+
+
+def fixture(name):
+    with open(join(FIXTURES, name), encoding='latin1') as fptr:
+        return fptr.read()
+
+
+def synthetic_data(years, start=date(2000, 1, 1), genera=None):
+    '''
+    Generate a set of :py:class:`Datum` instances for *years* years of daily
+    counts for all *genera* (defaults to all known genera).
+    '''
+    genera = genera or GENUS_NAMES[:33]
+    output = set()
+    for offset in range(int(years * 365)):
+        day = start + timedelta(days=offset)
+        season = abs(182 - day.timetuple().tm_yday)
+        for index, genus in enumerate(genera):
+            output.add(Datum(day, genus, (season * (index + 7)) % 150))
+    return output
+
+
+class NullHandler:
+
+    def handle(self, pollen_family, symptom_strength):
+        pass
+
+    def handle_raw_data(self, data):
+        pass
+
+
+class StubHttp:
+
+    class Response:
+
+        def __init__(self, text):
+            self.text = text
+
+    def __init__(self, text):
+        self.response = self.Response(text)
+
+    def get(self, url, **kwargs):
+        return self.response
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def measure(function, repeat, warmup=1):
+    '''
+    Run *function* *repeat* times and return its timing and memory
+    statistics.
+    '''
+    for _ in range(warmup):
+        function()
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        timings.append(perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = sum(timings)
+    return {
+        'repeat': repeat,
+        'ops_per_sec': repeat / total if total else float('inf'),
+        'mean': total / repeat,
+        'p50': percentile(timings, 0.5),
+        'p90': percentile(timings, 0.9),
+        'p99': percentile(timings, 0.99),
+        'peak_memory': peak,
+    }
+
+
+def benchmarks(scale=1.0, years=10):
+    '''
+    Return the benchmarks as ``(name, function, repeat)`` tuples. *scale*
+    multiplies the number of repetitions, *years* is the size of the
+    synthetic history.
+    '''
+    page1 = fixture('data1.html')
+    page2 = fixture('data2.html')
+    season = synthetic_data(1)
+    history = synthetic_data(years)
+    history_frame = PollenFrame.from_data(history)
+    season_dates = sorted({datum.date for datum in season})
+    history_dates = sorted({datum.date for datum in history})
+    week = parse(page2)
+    day = date(2014, 4, 11)
+
+    probe = Probe(StubHttp(page2), Emitter())
+
+    fanout = Emitter()
+    for _ in range(100):
+        fanout.add_handler(NullHandler())
+
+    store = QueryHandler()
+    store.load(season)
+    api = QueryAPI(store)
+
+    def request(path, query=''):
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path,
+                   'QUERY_STRING': query}
+        return api(environ, lambda status, headers: None)
+
+    stats = PollenStats()
+    stats.load(history)
+    last = history_dates[-1]
+    forecaster = Forecaster()
+    forecaster.update(history)
+
+    def repeat(count):
+        return max(1, int(count * scale))
+
+    return [
+        ('parse/stream/data1', lambda: parse(page1), repeat(200)),
+        ('parse/stream/data2', lambda: parse(page2), repeat(200)),
+        ('parse/soup/data2', lambda: parse(page2, 'soup'), repeat(20)),
+        ('warnings/week', lambda: warnings(week, day), repeat(500)),
+        ('warnings/season-loop',
+         lambda: [warnings(season, day) for day in season_dates[:30]],
+         repeat(5)),
+        ('warnings_range/season',
+         lambda: warnings_range(season, season_dates), repeat(20)),
+        ('warnings_range/history-frame',
+         lambda: warnings_range(history_frame, history_dates), repeat(5)),
+        ('classify/history-frame',
+         lambda: default_classifier().classify_columns(
+             history_frame.genera, history_frame.values), repeat(5)),
+        ('probe/execute', lambda: probe.execute(day), repeat(200)),
+        ('emitter/disseminate/100-handlers',
+         lambda: fanout.disseminate(day, week), repeat(1000)),
+        ('emitter/warn/100-handlers',
+         lambda: fanout.warn('betula', 'high'), repeat(1000)),
+        ('stats/moving-average/month',
+         lambda: stats.moving_averages('Betula', last - timedelta(days=29),
+                                       last), repeat(500)),
+        ('stats/year-over-year',
+         lambda: stats.year_over_year('Betula', last), repeat(5000)),
+        ('forecast/week',
+         lambda: forecaster.forecast_warnings(last + timedelta(days=1), 7),
+         repeat(500)),
+        ('api/date', lambda: request('/dates/2000-04-11'), repeat(5000)),
+        ('api/range/month',
+         lambda: request('/range', 'start=2000-04-01&end=2000-04-30'),
+         repeat(5000)),
+    ]
+
+
+def run(scale=1.0, years=10, selected=None, stream=sys.stdout):
+    '''
+    Run all benchmarks (or those whose name starts with one of the prefixes
+    in *selected*) and return the results as dictionary.
+    '''
+    results = {}
+    for name, function, repeat in benchmarks(scale, years):
+        if selected and not any(name.startswith(prefix)
+                                for prefix in selected):
+            continue
+        results[name] = stats = measure(function, repeat)
+        if stream:
+            print('%-36s %10.1f ops/s  p50 %8.3fms  p99 %8.3fms  '
+                  'peak %8.1fKiB' % (
+                      name, stats['ops_per_sec'], stats['p50'] * 1000,
+                      stats['p99'] * 1000, stats['peak_memory'] / 1024),
+                  file=stream)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'years': years,
+        'results': results,
+    }
+
+
+def compare(baseline, current, tolerance=DEFAULT_TOLERANCE,
+            stream=sys.stdout):
+    '''
+    Compare the median latencies of two runs. Returns the names of the
+    benchmarks which got slower than *tolerance* allows.
+    '''
+    if baseline.get('years') != current.get('years') and stream:
+        print('Warning: the baseline used %s years of synthetic history, '
+              'this run %s years' % (baseline.get('years'),
+                                     current.get('years')), file=stream)
+    regressions = []
+    for name, stats in sorted(current['results'].items()):
+        old = baseline['results'].get(name)
+        if not old:
+            continue
+        ratio = stats['p50'] / old['p50'] if old['p50'] else float('inf')
+        if ratio > tolerance:
+            regressions.append(name)
+        if stream:
+            print('%-36s %6.2fx %s' % (
+                name, ratio, 'REGRESSION' if ratio > tolerance else ''),
+                file=stream)
+    return regressions
+
+
+def main(args):
+    '''
+    Run the benchmarks as configured by the parsed command-line *args*.
+    Returns a non-zero exit code if regressions were found.
+    '''
+    current = run(args.scale, args.years, args.only)
+    if args.save:
+        with open(args.save, 'w') as fptr:
+            json.dump(current, fptr, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as fptr:
+            baseline = json.load(fptr)
+        if compare(baseline, current, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    from .cli import main as cli_main
+    sys.exit(cli_main(['bench'] + sys.argv[1:]))
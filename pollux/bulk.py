@@ -0,0 +1,149 @@
+'''
+Bulk parsing of archived pollen.lu pages on multiple CPU cores.
+'''
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from mmap import ACCESS_READ, mmap
+from os import cpu_count
+from tempfile import NamedTemporaryFile
+import logging
+
+from . import parse
+
+LOG = logging.getLogger(__name__)
+
+#: Encoding of the pages served by pollen.lu
+ENCODING = 'latin1'
+
+#: Size in bytes after which a new spool file is started.
+SPOOL_SIZE = 64 * 1024 * 1024
+
+
+def _parse_file(path, offset=0, length=None, encoding=ENCODING, engine=None):
+    '''
+    Parse a page stored in a file. If *length* is given, only the slice of
+    *length* bytes starting at *offset* is parsed.
+    '''
+    with open(path, 'rb') as fptr:
+        if length == 0 or (length is None and not fptr.seek(0, 2)):
+            return set()
+        with mmap(fptr.fileno(), 0, access=ACCESS_READ) as buffer:
+            end = len(buffer) if length is None else offset + length
+            data = str(buffer[offset:end], encoding)
+    return parse(data, engine)
+
+
+class _Spool:
+    '''
+    Temporary file collecting in-memory documents so they can be handed to
+    worker processes by reference instead of being pickled. :py:attr:`pending`
+    counts the documents of the file which have not been parsed yet.
+    '''
+
+    def __init__(self):
+        self.file = NamedTemporaryFile(prefix='pollux-spool-')
+        self.offset = 0
+        self.pending = 0
+
+    def add(self, data):
+        self.file.write(data)
+        self.file.flush()
+        offset, self.offset = self.offset, self.offset + len(data)
+        self.pending += 1
+        return offset, len(data)
+
+    def release(self):
+        '''
+        Mark one document as parsed. Returns whether none is left.
+        '''
+        self.pending -= 1
+        return not self.pending
+
+    def reset(self):
+        '''
+        Start over with an empty file. Only call this once all documents were
+        parsed.
+        '''
+        self.file.seek(0)
+        self.file.truncate()
+        self.offset = 0
+
+    def close(self):
+        self.file.close()
+
+
+def parse_many(documents, workers=None, encoding=ENCODING, engine=None,
+               window=None):
+    '''
+    Parse many pages in parallel and yield the resulting sets of
+    :py:class:`pollux.model.Datum` in the same order as *documents*.
+
+    :param documents: An iterable of file-names or :py:class:`bytes`
+        objects. It is consumed lazily.
+    :param workers: Number of worker processes. Defaults to the number of
+        CPUs. With one worker, everything is parsed in the current process.
+    :param encoding: The encoding of the documents.
+    :param engine: The parser engine (see :py:func:`pollux.parse`).
+    :param window: Maximum number of documents being processed at the same
+        time. Defaults to four times the number of workers.
+
+    Worker processes only receive file names. Documents given as bytes are
+    appended to a temporary spool file which the workers read (memory
+    mapped) at the given offset. The spool file is emptied whenever all its
+    documents were parsed, and a new one is started once it holds
+    :py:data:`SPOOL_SIZE` bytes.
+
+    If the consumer stops early, the documents which are not being parsed yet
+    are cancelled.
+    '''
+    workers = workers or cpu_count() or 1
+    if workers == 1:
+        for document in documents:
+            if isinstance(document, bytes):
+                yield parse(document.decode(encoding), engine)
+            else:
+                yield _parse_file(document, encoding=encoding, engine=engine)
+        return
+
+    spools = []
+    pending = deque()
+    window = window or workers * 4
+
+    def result():
+        future, spool = pending.popleft()
+        data = future.result()
+        if spool is not None and spool.release():
+            if spool is spools[-1]:
+                spool.reset()
+            else:
+                spool.close()
+                spools.remove(spool)
+        return data
+
+    try:
+        with ProcessPoolExecutor(workers) as executor:
+            try:
+                for document in documents:
+                    spool = None
+                    if isinstance(document, bytes):
+                        if not spools or spools[-1].offset >= SPOOL_SIZE:
+                            spools.append(_Spool())
+                        spool = spools[-1]
+                        offset, length = spool.add(document)
+                        args = (spool.file.name, offset, length)
+                    else:
+                        args = (document, 0, None)
+                    pending.append((executor.submit(
+                        _parse_file, *args, encoding=encoding,
+                        engine=engine), spool))
+                    if len(pending) >= window:
+                        yield result()
+                while pending:
+                    yield result()
+            finally:
+                # before leaving the executor, which waits for all futures
+                for future, _ in pending:
+                    future.cancel()
+    finally:
+        for spool in spools:
+            spool.close()
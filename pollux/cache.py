@@ -0,0 +1,198 @@
+'''
+In-memory caches of parsed pollen.lu pages.
+'''
+from collections import OrderedDict
+from hashlib import blake2b
+from sys import getsizeof
+from threading import Lock
+import logging
+
+from .metrics import active as active_metrics
+
+LOG = logging.getLogger(__name__)
+
+
+def index_by_date(data):
+    '''
+    Group an iterable of :py:class:`pollux.model.Datum` instances by date.
+    Returns a dictionary mapping each date to a set of :py:class:`Datum`.
+    '''
+    output = {}
+    for datum in data:
+        output.setdefault(datum.date, set()).add(datum)
+    return output
+
+
+def _sizeof(index):
+    '''
+    Estimate the memory used by a date index (see :py:func:`index_by_date`).
+    The strings and dates shared between rows are not accounted for.
+    '''
+    size = getsizeof(index)
+    for rows in index.values():
+        size += getsizeof(rows) + sum(getsizeof(row) for row in rows)
+    return size
+
+
+class PollenCache:
+    '''
+    Least-recently-used cache mapping ``(year, week)`` keys to the parsed data
+    of that week, indexed by date.
+
+    :param max_entries: Maximum number of weeks kept in the cache.
+    :param max_bytes: Maximum (estimated) memory used by the cached data.
+
+    The cache may be shared between threads.
+    '''
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        '''
+        Return the date index of the week *key* or ``None`` if the week is not
+        cached.
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                active_metrics().increment('pollux_cache_misses_total')
+                return None
+            self.hits += 1
+            active_metrics().increment('pollux_cache_hits_total')
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, data):
+        '''
+        Store the :py:class:`pollux.model.Datum` instances *data* of the week
+        *key*. Returns the date index of the week.
+        '''
+        index = index_by_date(data)
+        size = _sizeof(index)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._entries[key] = index, size
+            self.nbytes += size
+            self._evict()
+        return index
+
+    def lookup(self, date):
+        '''
+        Return the rows of *date* or ``None`` if its week is not cached.
+        '''
+        # local import to avoid a circular import
+        from . import week_key
+        index = self.get(week_key(date))
+        if index is None:
+            return None
+        return index.get(date, set())
+
+    def _evict(self):
+        while self._entries and (
+                (self.max_entries is not None and
+                 len(self._entries) > self.max_entries) or
+                (self.max_bytes is not None and
+                 self.nbytes > self.max_bytes)):
+            key, (_, size) = self._entries.popitem(last=False)
+            LOG.debug('Evicting week %r from the cache', key)
+            self.nbytes -= size
+
+    def discard(self, key):
+        '''
+        Forget the week *key* (if cached) so that it is fetched again.
+        '''
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.nbytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ParseMemo:
+    '''
+    Remembers the parsed result of page bodies by their content hash, so that
+    a page which did not change since it was last fetched is not parsed again.
+
+    :param max_entries: Maximum number of remembered pages. The least recently
+        used pages are forgotten first.
+
+    :py:attr:`hits` counts the skipped parses, :py:attr:`misses` the pages
+    which had to be parsed. The memo may be shared between threads.
+    '''
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def key(text):
+        '''
+        Return the content hash of the page body *text*.
+        '''
+        return blake2b(text.encode('utf8', 'surrogatepass'),
+                       digest_size=20).digest()
+
+    def get(self, key):
+        '''
+        Return the parsed data for the content hash *key* or ``None``.
+        '''
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            active_metrics().increment('pollux_parse_skipped_total')
+            self._entries.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        '''
+        Remember the parsed *data* for the content hash *key*. Returns the
+        data as :py:class:`frozenset`.
+        '''
+        data = frozenset(data)
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return data
+
+    def parse(self, text, engine=None):
+        '''
+        Like :py:func:`pollux.parse` but skipped if *text* was parsed before.
+        '''
+        # local import to avoid a circular import
+        from . import parse
+        key = self.key(text)
+        data = self.get(key)
+        if data is None:
+            data = self.put(key, parse(text, engine))
+        return data
+
+    def __len__(self):
+        return len(self._entries)
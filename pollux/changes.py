@@ -0,0 +1,86 @@
+'''
+Emission of changed data only.
+
+:py:class:`ChangeFilter` wraps an :py:class:`pollux.emitter.Emitter` and
+remembers the values last disseminated for each date. Subsequent calls to
+``disseminate`` only pass on the rows which were added or whose value changed
+and are skipped entirely if nothing changed.
+'''
+from datetime import date as makedate
+from os import replace
+import json
+import logging
+
+LOG = logging.getLogger(__name__)
+
+
+class ChangeFilter:
+    '''
+    :param emitter: The wrapped emitter. All attributes other than
+        ``disseminate`` are forwarded to it, so the filter can be passed to
+        :py:class:`pollux.Probe` instead of the emitter.
+    :param path: Optional file in which the snapshots are stored between
+        runs.
+    :param full: If true, the complete set of values of a date is passed on
+        whenever anything changed for that date instead of only the changed
+        rows.
+    :param keep: Number of most recent dates to remember (at least one).
+
+    A snapshot is only updated once the wrapped emitter accepted the data, so
+    data which could not be disseminated is passed on again next time.
+    '''
+
+    def __init__(self, emitter, path=None, full=False, keep=62):
+        if keep < 1:
+            raise ValueError('keep must be at least 1, got %r' % (keep,))
+        self.emitter = emitter
+        self.path = path
+        self.full = full
+        self.keep = keep
+        self.skipped = 0
+        self.snapshots = self.load() if path else {}
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf8') as fptr:
+                raw = json.load(fptr)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            LOG.warning('Ignoring unreadable state file %s', self.path)
+            return {}
+        return {makedate.fromisoformat(key): values
+                for key, values in raw.items()}
+
+    def save(self):
+        raw = {key.isoformat(): values
+               for key, values in self.snapshots.items()}
+        with open(self.path + '.tmp', 'w', encoding='utf8') as fptr:
+            json.dump(raw, fptr)
+        replace(self.path + '.tmp', self.path)
+
+    def changes(self, date, values):
+        '''
+        Return the rows of *values* which differ from the snapshot of *date*.
+        '''
+        snapshot = self.snapshots.get(date, {})
+        return {datum for datum in values
+                if snapshot.get(datum.lname) != datum.value}
+
+    def disseminate(self, date, values):
+        changed = self.changes(date, values)
+        if not changed:
+            LOG.debug('No changes for %s', date)
+            self.skipped += 1
+            return
+        self.emitter.disseminate(date, set(values) if self.full else changed)
+        snapshot = self.snapshots.setdefault(date, {})
+        snapshot.update((datum.lname, datum.value) for datum in values)
+        for old in sorted(self.snapshots)[:-self.keep]:
+            del self.snapshots[old]
+        if self.path:
+            self.save()
+
+    def __getattr__(self, name):
+        return getattr(self.emitter, name)
+
@@ -0,0 +1,194 @@
+'''
+Compiled classification of pollen counts into symptom strengths.
+
+A :py:class:`Scheme` describes how counts are classified: for each genus an
+ascending sequence of limits and one label per bucket between them (one
+more label than limits). A count falls into the bucket found by
+:py:func:`bisect.bisect_right`, so ``limits[i - 1] <= count < limits[i]``
+yields ``labels[i]``.
+
+A :py:class:`Classifier` compiles a scheme once into tables indexed by the
+genus codes of :py:data:`pollux.frame.GENUS_NAMES`. Classifying a row is
+then one list lookup and one binary search, without string operations.
+
+The default scheme follows the classes of P. G. von Wahl (see
+:py:mod:`pollux.data`). Other schemes can be loaded from JSON files (see
+:py:meth:`Scheme.from_file`) and made the default with :py:func:`install`.
+'''
+from bisect import bisect_right
+from threading import Lock
+import json
+
+from . import frame
+from .data import THRESHOLDS, Threshold
+from .model import SymptomStrength
+
+#: Labels of the buckets of the von Wahl scheme. Negative counts are
+#: errors and zero raises no warning.
+VON_WAHL_LABELS = (SymptomStrength.ERROR, None, SymptomStrength.LOW,
+                   SymptomStrength.MEDIUM, SymptomStrength.HIGH)
+
+
+def von_wahl_limits(threshold):
+    '''
+    Return the limits of the von Wahl buckets for a
+    :py:class:`pollux.data.Threshold` (counts are integers).
+    '''
+    return (0, 1, threshold.light, threshold.medium)
+
+
+class Scheme:
+    '''
+    :param name: Name of the scheme.
+    :param labels: Label of each bucket. ``None`` means "no warning".
+    :param limits: Dictionary mapping lower-case genus names to the
+        ascending limits between the buckets (``len(labels) - 1`` values).
+    :param default: Limits used for genera missing from *limits*. If
+        ``None``, such genera are classified as
+        :py:attr:`pollux.model.SymptomStrength.UNKNOWN`.
+    '''
+
+    def __init__(self, name, labels, limits, default=None):
+        self.name = name
+        self.labels = tuple(labels)
+        self.limits = {}
+        for genus, values in limits.items():
+            self.limits[genus.lower()] = self._check(genus, values)
+        self.default = None if default is None else self._check(
+            'default', default)
+
+    def _check(self, genus, values):
+        values = tuple(values)
+        if len(values) != len(self.labels) - 1:
+            raise ValueError('%s: expected %d limits, got %d' % (
+                genus, len(self.labels) - 1, len(values)))
+        if list(values) != sorted(values):
+            raise ValueError('%s: limits must be ascending' % genus)
+        return values
+
+    def entry(self, genus):
+        '''
+        Return the ``(limits, labels)`` used for the genus named *genus*.
+        '''
+        limits = self.limits.get(genus.lower(), self.default)
+        if limits is None:
+            return (), (SymptomStrength.UNKNOWN,)
+        return limits, self.labels
+
+    @classmethod
+    def von_wahl(cls, thresholds=THRESHOLDS):
+        '''
+        Return the scheme using the von Wahl classes of *thresholds* (a
+        dictionary mapping genus names to
+        :py:class:`pollux.data.Threshold` instances).
+        '''
+        return cls('von-wahl', VON_WAHL_LABELS, {
+            genus: von_wahl_limits(threshold)
+            for genus, threshold in thresholds.items()})
+
+    @classmethod
+    def from_file(cls, path):
+        '''
+        Load a scheme from the JSON file *path*. The file either contains a
+        complete scheme::
+
+            {"name": "custom",
+             "labels": ["error", null, "low", "medium", "high", "extreme"],
+             "limits": {"betula": [0, 1, 10, 50, 200]},
+             "default": [0, 1, 5, 20, 100]}
+
+        or only ``[light, medium]`` pairs which replace or extend the von
+        Wahl thresholds::
+
+            {"betula": [15, 60], "ambrosia": [1, 5]}
+        '''
+        with open(path, encoding='utf8') as fptr:
+            raw = json.load(fptr)
+        if 'labels' in raw:
+            return cls(raw.get('name', path), raw['labels'],
+                       raw.get('limits', {}), raw.get('default'))
+        thresholds = dict(THRESHOLDS)
+        for genus, (light, medium) in raw.items():
+            thresholds[genus.lower()] = Threshold(light, medium)
+        return cls.von_wahl(thresholds)
+
+
+class Classifier:
+    '''
+    A :py:class:`Scheme` compiled into tables indexed by genus code. The
+    classifier may be shared between threads.
+    '''
+
+    def __init__(self, scheme=None):
+        self.scheme = scheme or Scheme.von_wahl()
+        self.keys = []
+        self._limits = []
+        self._labels = []
+        self._lock = Lock()
+        self._compile()
+
+    def _compile(self):
+        # GENUS_NAMES grows when new genera are seen on a page. The key is
+        # appended last, so once tables() sees a code in the keys, its limits
+        # and labels are there too.
+        with self._lock:
+            names = frame.GENUS_NAMES
+            for code in range(len(self.keys), len(names)):
+                name = names[code]
+                limits, labels = self.scheme.entry(name)
+                self._limits.append(limits)
+                self._labels.append(labels)
+                self.keys.append(name.lower())
+
+    def tables(self):
+        '''
+        Return the warning keys, limits and labels by genus code.
+        '''
+        if len(self.keys) != len(frame.GENUS_NAMES):
+            self._compile()
+        return self.keys, self._limits, self._labels
+
+    def classify_code(self, code, value):
+        '''
+        Return the label of *value* for the genus with the code *code*.
+        '''
+        _, limits, labels = self.tables()
+        return labels[code][bisect_right(limits[code], value)]
+
+    def classify(self, lname, value):
+        '''
+        Return the label of *value* for the genus named *lname*.
+        '''
+        return self.classify_code(frame.genus_code(lname), value)
+
+    def classify_columns(self, codes, values):
+        '''
+        Return the labels for the genus codes *codes* and counts *values*
+        (for example the columns of a :py:class:`pollux.frame.PollenFrame`).
+        '''
+        _, limits, labels = self.tables()
+        return [labels[code][bisect_right(limits[code], value)]
+                for code, value in zip(codes, values)]
+
+
+_DEFAULT = None
+
+
+def default():
+    '''
+    Return the classifier used by :py:func:`pollux.warnings`.
+    '''
+    global _DEFAULT
+    if _DEFAULT is None:
+        _DEFAULT = Classifier()
+    return _DEFAULT
+
+
+def install(classifier):
+    '''
+    Make *classifier* the default and return it. Pass ``None`` to restore
+    the von Wahl scheme.
+    '''
+    global _DEFAULT
+    _DEFAULT = classifier
+    return default()
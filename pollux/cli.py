@@ -0,0 +1,302 @@
+'''
+Command-line interface.
+'''
+from argparse import ArgumentParser
+from datetime import date, datetime, timedelta
+import logging
+import sys
+
+LOG = logging.getLogger(__name__)
+
+
+def isodate(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def make_httplib(args, httplib=None):
+    if httplib is None:
+        import requests
+        httplib = requests
+    if args.cache:
+        from .httpcache import HttpCache
+        httplib = HttpCache(httplib, args.cache, max_size=args.cache_size)
+    return httplib
+
+
+def make_emitter(args):
+    from .emitter import Emitter, PrintHandler
+    emitter = Emitter()
+    emitter.add_handler(PrintHandler())
+    if getattr(args, 'state', None):
+        from .changes import ChangeFilter
+        emitter = ChangeFilter(emitter, args.state, full=args.full)
+    return emitter
+
+
+def probe(args):
+    from . import Probe
+    probe = Probe(make_httplib(args), make_emitter(args))
+    if args.end:
+        probe.execute_range(args.date, args.end)
+    else:
+        probe.execute(args.date)
+
+
+def daemon(args):
+    from . import Probe
+    from .cache import ParseMemo
+    from .daemon import Scheduler, make_session
+    session = make_session(args.pool_size, timeout=args.timeout)
+    emitter = make_emitter(args)
+    probe = Probe(make_httplib(args, session), emitter, memo=ParseMemo())
+    scheduler = Scheduler(probe, args.interval, jitter=args.jitter,
+                          days=args.days)
+    scheduler.install_signal_handlers()
+    try:
+        scheduler.run()
+    finally:
+        emitter.close()
+        session.close()
+
+
+def serve(args):
+    from threading import Thread
+    import signal
+    from .api import QueryAPI, QueryHandler, make_server
+    handler = QueryHandler()
+    store = scheduler = None
+    if args.db:
+        from .emitter import SQLiteHandler
+        store = SQLiteHandler(args.db)
+        handler.load(store.range(date.min, date.max))
+    if args.poll:
+        from . import Probe
+        from .cache import ParseMemo
+        from .daemon import Scheduler, make_session
+        from .emitter import Emitter
+        emitter = Emitter()
+        emitter.add_handler(handler)
+        if store is not None:
+            emitter.add_handler(store)
+        probe = Probe(make_httplib(args, make_session()), emitter,
+                      memo=ParseMemo())
+        scheduler = Scheduler(probe, args.poll)
+        Thread(target=scheduler.run, daemon=True).start()
+
+    server = make_server(QueryAPI(handler, args.max_age), args.host,
+                         args.port)
+    signal.signal(signal.SIGTERM,
+                  lambda *args: Thread(target=server.shutdown).start())
+    LOG.info('Serving %d dates on http://%s:%d/', len(handler.dates),
+             args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if scheduler is not None:
+            scheduler.stop()
+        server.server_close()
+        if store is not None:
+            store.close()
+
+
+def forecast(args):
+    from os.path import exists
+    from .emitter import Emitter, PrintHandler, SQLiteHandler
+    from .forecast import Forecaster
+    if args.models and exists(args.models):
+        forecaster = Forecaster.load(args.models)
+    else:
+        forecaster = Forecaster()
+    store = SQLiteHandler(args.db)
+    try:
+        forecaster.update(store.range(forecaster.since() or date.min,
+                                      date.max))
+    finally:
+        store.close()
+    if args.models:
+        forecaster.save(args.models)
+    emitter = Emitter()
+    emitter.add_handler(PrintHandler())
+    forecaster.publish(emitter, args.start, args.days)
+
+
+def backfill(args):
+    from .asyncprobe import AsyncProbe
+    probe = AsyncProbe(make_httplib(args), make_emitter(args),
+                       concurrency=args.concurrency, rate=args.rate)
+    probe.execute_range(args.start, args.end)
+
+
+def parse_files(args):
+    from .bulk import parse_many
+    for filename, data in zip(args.files,
+                              parse_many(args.files, workers=args.workers)):
+        for datum in sorted(data):
+            print('%s\t%s\t%s\t%d' % ((filename,) + datum))
+
+
+def bench(args):
+    from .bench import main
+    return main(args)
+
+
+def add_cache_arguments(parser):
+    parser.add_argument('--cache', metavar='DIR',
+                        help='Keep downloaded pages in this folder')
+    parser.add_argument('--cache-size', metavar='BYTES', type=int,
+                        help='Maximum size of the page cache')
+
+
+def add_state_arguments(parser):
+    parser.add_argument('--state', metavar='FILE',
+                        help='Only output data which changed since the last '
+                             'run. The last known data is stored in this '
+                             'file.')
+    parser.add_argument('--full', action='store_true',
+                        help='With --state: output all data of a date if '
+                             'anything changed, not only the changed rows')
+
+
+def parse_args(argv=None):
+    from . import __version__
+    parser = ArgumentParser(description='Pollen alert service for Luxembourg')
+    parser.add_argument('--version', action='version', version=__version__)
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='Enable debug output')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='Record timings and counters and write them to '
+                             'this file on exit. JSON if the file name ends '
+                             'with ".json", Prometheus text format otherwise.')
+    parser.add_argument('--thresholds', metavar='FILE',
+                        help='JSON file with custom warning thresholds or a '
+                             'custom classification scheme')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    cmd = commands.add_parser(
+        'probe', help='Fetch the data for one date or a range of dates')
+    cmd.add_argument('date', type=isodate, nargs='?', default=date.today(),
+                     help='The (first) date to fetch as YYYY-MM-DD. '
+                          'Default: today')
+    cmd.add_argument('end', type=isodate, nargs='?',
+                     help='If given, fetch all dates up to (and including) '
+                          'this date. Each week is only downloaded once.')
+    cmd.set_defaults(func=probe)
+    add_state_arguments(cmd)
+    add_cache_arguments(cmd)
+
+    cmd = commands.add_parser(
+        'daemon', help='Keep running and fetch the data at regular intervals')
+    cmd.add_argument('--interval', type=float, default=3600,
+                     help='Seconds between two polls. Default: 3600')
+    cmd.add_argument('--jitter', type=float, default=0.1,
+                     help='Randomly vary the interval by up to this fraction. '
+                          'Default: 0.1')
+    cmd.add_argument('--days', type=int, default=1,
+                     help='Number of days (ending today) fetched on each '
+                          'poll. Default: 1')
+    cmd.add_argument('--pool-size', type=int, default=4,
+                     help='Number of HTTP connections kept alive. Default: 4')
+    cmd.add_argument('--timeout', type=float, default=30,
+                     help='HTTP timeout in seconds. Default: 30')
+    cmd.set_defaults(func=daemon)
+    add_state_arguments(cmd)
+    add_cache_arguments(cmd)
+
+    cmd = commands.add_parser(
+        'serve', help='Serve the data as JSON over HTTP')
+    cmd.add_argument('--host', default='127.0.0.1',
+                     help='Address to listen on. Default: 127.0.0.1')
+    cmd.add_argument('--port', type=int, default=8080,
+                     help='Port to listen on. Default: 8080')
+    cmd.add_argument('--db', metavar='FILE',
+                     help='SQLite database to load the data from. New data '
+                          'fetched with --poll is stored in it as well.')
+    cmd.add_argument('--poll', metavar='SECONDS', type=float,
+                     help='Fetch the data of the current day in the '
+                          'background at this interval')
+    cmd.add_argument('--max-age', type=int, default=300,
+                     help='Seconds clients may cache responses. Default: 300')
+    cmd.set_defaults(func=serve)
+    add_cache_arguments(cmd)
+
+    cmd = commands.add_parser(
+        'forecast', help='Print the expected warnings for the coming days')
+    cmd.add_argument('db', metavar='DB',
+                     help='SQLite database with the history (see --db of '
+                          'the serve command)')
+    cmd.add_argument('start', type=isodate, nargs='?',
+                     default=date.today() + timedelta(days=1),
+                     help='First day to forecast. Default: tomorrow')
+    cmd.add_argument('--days', type=int, default=3,
+                     help='Number of days to forecast. Default: 3')
+    cmd.add_argument('--models', metavar='FILE',
+                     help='Keep the model parameters in this file and only '
+                          'update them with new data on the next run')
+    cmd.set_defaults(func=forecast)
+
+    cmd = commands.add_parser(
+        'backfill', help='Fetch a large range of dates concurrently')
+    cmd.add_argument('start', type=isodate, help='The first date to fetch')
+    cmd.add_argument('end', type=isodate, help='The last date to fetch')
+    cmd.add_argument('--concurrency', type=int, default=8,
+                     help='Maximum number of simultaneous requests')
+    cmd.add_argument('--rate', type=float,
+                     help='Maximum number of requests per second')
+    cmd.set_defaults(func=backfill)
+    add_cache_arguments(cmd)
+
+    cmd = commands.add_parser(
+        'parse', help='Parse saved pollen.lu pages in parallel')
+    cmd.add_argument('files', nargs='+', metavar='FILE',
+                     help='The HTML files to parse')
+    cmd.add_argument('--workers', type=int,
+                     help='Number of worker processes. Default: one per CPU')
+    cmd.set_defaults(func=parse_files)
+
+    cmd = commands.add_parser(
+        'bench', help='Run the performance benchmarks')
+    cmd.add_argument('--scale', type=float, default=1.0,
+                     help='Multiplier for the number of repetitions')
+    cmd.add_argument('--years', type=int, default=10,
+                     help='Years of synthetic history. Default: 10')
+    cmd.add_argument('--only', action='append', metavar='PREFIX',
+                     help='Only run benchmarks with this name prefix')
+    cmd.add_argument('--save', metavar='FILE',
+                     help='Store the results as JSON baseline')
+    cmd.add_argument('--compare', metavar='FILE',
+                     help='Compare the results to a JSON baseline')
+    cmd.add_argument('--tolerance', type=float, default=1.25,
+                     help='Allowed slow-down factor when comparing. '
+                          'Default: 1.25')
+    cmd.set_defaults(func=bench)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    if args.thresholds:
+        from .classifier import Classifier, Scheme, install
+        install(Classifier(Scheme.from_file(args.thresholds)))
+    if not args.metrics:
+        return args.func(args)
+
+    from .metrics import Metrics, install
+    metrics = install(Metrics())
+    try:
+        return args.func(args)
+    finally:
+        install(None)
+        with open(args.metrics, 'w') as fptr:
+            if args.metrics.endswith('.json'):
+                fptr.write(metrics.to_json())
+            else:
+                fptr.write(metrics.to_prometheus())
+
+
+if __name__ == '__main__':
+    sys.exit(main())
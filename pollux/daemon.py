@@ -0,0 +1,158 @@
+'''
+Long-running process polling pollen.lu at regular intervals.
+
+Running the probe from cron pays the interpreter start-up, the imports and a
+new TCP connection on every poll. :py:class:`Scheduler` instead keeps one
+:py:class:`pollux.Probe` (with its caches) and one pooled keep-alive HTTP
+session alive and calls :py:meth:`pollux.Probe.execute` repeatedly::
+
+    probe = Probe(make_session(), emitter, cache=PollenCache(),
+                  memo=ParseMemo())
+    scheduler = Scheduler(probe, interval=1800)
+    scheduler.install_signal_handlers()
+    scheduler.run()
+'''
+from datetime import date as makedate, timedelta
+from random import random
+from threading import Event
+import logging
+import signal
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import daterange, week_key
+from .metrics import active as active_metrics
+
+LOG = logging.getLogger(__name__)
+
+#: Signals which stop the scheduler after the current run.
+STOP_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+
+class Session(requests.Session):
+    '''
+    :py:class:`requests.Session` applying a default *timeout* to all
+    requests, so that a stalled connection cannot block the daemon forever.
+    '''
+
+    def __init__(self, timeout=None):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def make_session(pool_size=4, timeout=30, retries=2):
+    '''
+    Create a HTTP session keeping up to *pool_size* connections per host
+    alive between requests.
+
+    :param timeout: Connect and read timeout in seconds.
+    :param retries: Number of retries for failed connection attempts.
+    '''
+    session = Session(timeout)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class Scheduler:
+    '''
+    Executes a :py:class:`pollux.Probe` every *interval* seconds until
+    :py:meth:`stop` is called.
+
+    :param probe: The probe to execute. Its caches, HTTP session and emitter
+        are shared between runs.
+    :param interval: Seconds to wait between two runs.
+    :param jitter: Each delay is randomly shortened or lengthened by up to
+        this fraction of *interval*, so that several daemons do not poll in
+        lock-step.
+    :param days: Number of days (ending today) fetched on each run.
+    :param today: Callable returning the current date.
+
+    The weeks fetched by a run are removed from the probe's
+    :py:class:`pollux.cache.PollenCache` first, as their pages may have
+    changed since the previous run. Unchanged pages are still not parsed
+    again if the probe has a :py:class:`pollux.cache.ParseMemo`.
+    '''
+
+    def __init__(self, probe, interval=3600, jitter=0.1, days=1,
+                 today=makedate.today):
+        self.probe = probe
+        self.interval = interval
+        self.jitter = jitter
+        self.days = days
+        self.today = today
+        self.runs = 0
+        self.failures = 0
+        self._stop = Event()
+
+    def delay(self):
+        '''
+        Return the number of seconds to wait before the next run.
+        '''
+        return max(0, self.interval * (1 + self.jitter * (2 * random() - 1)))
+
+    def run_once(self):
+        '''
+        Execute the probe once. Errors are logged and counted but do not
+        stop the scheduler. Returns ``True`` if the run succeeded.
+        '''
+        end = self.today()
+        start = end - timedelta(days=self.days - 1)
+        if self.probe.cache is not None:
+            for key in {week_key(day) for day in daterange(start, end)}:
+                self.probe.cache.discard(key)
+        self.runs += 1
+        try:
+            if start == end:
+                self.probe.execute(end)
+            else:
+                self.probe.execute_range(start, end)
+        except Exception:
+            self.failures += 1
+            active_metrics().increment('pollux_daemon_failures_total')
+            LOG.exception('Probe failed for %s to %s', start, end)
+            return False
+        active_metrics().increment('pollux_daemon_runs_total')
+        return True
+
+    def run(self, runs=None):
+        '''
+        Execute the probe repeatedly until :py:meth:`stop` is called or
+        *runs* runs were made.
+        '''
+        LOG.info('Polling every %s seconds', self.interval)
+        count = 0
+        while not self._stop.is_set():
+            self.run_once()
+            count += 1
+            if runs is not None and count >= runs:
+                break
+            delay = self.delay()
+            LOG.debug('Next run in %.1f seconds', delay)
+            self._stop.wait(delay)
+        LOG.info('Scheduler stopped after %d runs', count)
+
+    def stop(self, signum=None, frame=None):
+        '''
+        Stop the scheduler once the current run is finished. Can be used as
+        signal handler.
+        '''
+        self._stop.set()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def install_signal_handlers(self, signals=STOP_SIGNALS):
+        '''
+        Stop the scheduler on *signals*. Must be called from the main thread.
+        '''
+        for signum in signals:
+            signal.signal(signum, self.stop)
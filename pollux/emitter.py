@@ -1,4 +1,13 @@
+from collections import deque
+from datetime import date as makedate
+from functools import partial
+from operator import methodcaller
+from threading import Condition, Lock
 import logging
+import sys
+
+from .metrics import active as active_metrics
+from .model import Datum
 
 LOG = logging.getLogger(__name__)
 
@@ -17,22 +26,348 @@ class MemoryHandler:
         self.disseminated_data = data
 
 
+class PrintHandler:
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def handle(self, pollen_family, symptom_strength):
+        print('%s: %s' % (pollen_family, symptom_strength), file=self.stream)
+
+    def handle_batch(self, date, warnings):
+        for pollen_family, symptom_strength in sorted(warnings.items()):
+            print('%s\t%s\t%s' % (date, pollen_family, symptom_strength),
+                  file=self.stream)
+
+    def handle_digests(self, date, digests):
+        for subscriber, warnings in digests:
+            for pollen_family, symptom_strength in sorted(warnings.items()):
+                print('%s\t%s\t%s\t%s' % (date, subscriber, pollen_family,
+                                           symptom_strength),
+                      file=self.stream)
+
+    def handle_raw_data(self, data):
+        for datum in sorted(data['values']):
+            print('%s\t%s\t%d' % datum, file=self.stream)
+
+
+class SQLiteHandler:
+    '''
+    Stores the disseminated data in an SQLite database.
+
+    Each call to ``handle_raw_data`` is written with one bulk upsert in a
+    single transaction. Warnings passed with ``handle_batch`` are stored as
+    well. Single warnings (``handle``) are ignored as they carry no date.
+
+    :param path: The database file name.
+    '''
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS pollen (
+            date TEXT NOT NULL,
+            genus TEXT NOT NULL,
+            value INTEGER NOT NULL,
+            PRIMARY KEY (date, genus)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS pollen_genus ON pollen (genus, date);
+        CREATE TABLE IF NOT EXISTS warning (
+            date TEXT NOT NULL,
+            genus TEXT NOT NULL,
+            strength TEXT NOT NULL,
+            PRIMARY KEY (date, genus)
+        ) WITHOUT ROWID;
+    '''
+
+    def __init__(self, path):
+        # sqlite3 is imported on first use as it is not needed by most users
+        # and slows down start-up.
+        import sqlite3
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = Lock()
+        with self._lock:
+            if path != ':memory:':
+                self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.executescript(self.SCHEMA)
+
+    def store(self, data):
+        '''
+        Insert or update the :py:class:`Datum` instances in *data* in one
+        transaction.
+        '''
+        rows = ((datum.date.isoformat(), datum.lname, datum.value)
+                for datum in data)
+        with self._lock, self.connection:
+            self.connection.executemany(
+                'INSERT INTO pollen (date, genus, value) VALUES (?, ?, ?) '
+                'ON CONFLICT (date, genus) DO UPDATE SET value=excluded.value',
+                rows)
+
+    def handle(self, pollen_family, symptom_strength):
+        LOG.debug('Ignoring warning %r, %r without date',
+                  pollen_family, symptom_strength)
+
+    def handle_batch(self, date, warnings):
+        rows = ((date.isoformat(), genus, strength)
+                for genus, strength in warnings.items())
+        with self._lock, self.connection:
+            self.connection.executemany(
+                'INSERT INTO warning (date, genus, strength) '
+                'VALUES (?, ?, ?) ON CONFLICT (date, genus) '
+                'DO UPDATE SET strength=excluded.strength',
+                rows)
+
+    def handle_raw_data(self, data):
+        self.store(data['values'])
+
+    def _query(self, query, args):
+        with self._lock:
+            return self.connection.execute(query, args).fetchall()
+
+    def range(self, start, end, genera=None):
+        '''
+        Return the :py:class:`Datum` instances from *start* to *end* (both
+        inclusive), sorted by date and genus, optionally limited to the genus
+        names in *genera*.
+        '''
+        query = 'SELECT date, genus, value FROM pollen ' \
+                'WHERE date BETWEEN ? AND ?'
+        args = [start.isoformat(), end.isoformat()]
+        if genera is not None:
+            genera = list(genera)
+            query += ' AND genus IN (%s)' % ', '.join('?' * len(genera))
+            args.extend(genera)
+        query += ' ORDER BY date, genus'
+        return [Datum(makedate.fromisoformat(date), genus, value)
+                for date, genus, value in self._query(query, args)]
+
+    def series(self, genus, start=None, end=None):
+        '''
+        Return the ``(date, value)`` pairs of one genus, sorted by date.
+        '''
+        rows = self._query(
+            'SELECT date, value FROM pollen WHERE genus = ? '
+            'AND date BETWEEN ? AND ? ORDER BY date',
+            (genus,
+             (start or makedate.min).isoformat(),
+             (end or makedate.max).isoformat()))
+        return [(makedate.fromisoformat(date), value) for date, value in rows]
+
+    def warnings(self, date):
+        '''
+        Return the stored warnings of *date*.
+        '''
+        rows = self._query(
+            'SELECT genus, strength FROM warning WHERE date = ?',
+            (date.isoformat(),))
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+class Overflow:
+    '''
+    What happens when a handler queue of a threaded :py:class:`Emitter` is
+    full.
+    '''
+
+    #: Wait until the handler has caught up.
+    BLOCK = 'block'
+    #: Discard the new item.
+    DROP_NEW = 'drop-new'
+    #: Discard the oldest queued item.
+    DROP_OLD = 'drop-old'
+
+
+def deliver_batch(handler, date, warnings):
+    '''
+    Pass the *warnings* (a dictionary mapping pollen families to symptom
+    strengths) for *date* to *handler*. If the handler does not implement
+    ``handle_batch``, its ``handle`` method is called for each warning.
+    '''
+    handle_batch = getattr(handler, 'handle_batch', None)
+    if handle_batch is not None:
+        handle_batch(date, warnings)
+        return
+    for pollen_family, symptom_strength in warnings.items():
+        handler.handle(pollen_family, symptom_strength)
+
+
+def deliver_digests(handler, date, digests):
+    '''
+    Pass the *digests* for *date* (a list of ``(subscriber, warnings)``
+    tuples, see :py:mod:`pollux.subscriptions`) to *handler*. Handlers which
+    do not implement ``handle_digests`` are skipped.
+    '''
+    handle_digests = getattr(handler, 'handle_digests', None)
+    if handle_digests is not None:
+        handle_digests(date, digests)
+
+
+def _call_handler(call, handler, metrics):
+    '''
+    Execute *call* for *handler*, recording its duration in *metrics*.
+    '''
+    if not metrics.enabled:
+        call(handler)
+        return
+    with metrics.timer('pollux_handler_seconds',
+                       handler=type(handler).__name__):
+        call(handler)
+
+
+class _HandlerQueue:
+    '''
+    Queue of calls for one handler. The calls are executed on an executor, one
+    after the other, in the order they were queued. Each call is a callable
+    taking the handler as only argument.
+    '''
+
+    def __init__(self, handler, executor, maxsize, overflow):
+        self.handler = handler
+        self.executor = executor
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+        self._items = deque()
+        self._running = False
+        self._condition = Condition()
+
+    def put(self, call):
+        with self._condition:
+            if self.maxsize and len(self._items) >= self.maxsize:
+                if self.overflow == Overflow.DROP_NEW:
+                    LOG.warning('Queue of %r is full. Dropping newest call.',
+                                self.handler)
+                    self.dropped += 1
+                    return
+                elif self.overflow == Overflow.DROP_OLD:
+                    LOG.warning('Queue of %r is full. Dropping oldest call.',
+                                self.handler)
+                    self.dropped += 1
+                    self._items.popleft()
+                else:
+                    self._condition.wait_for(
+                        lambda: len(self._items) < self.maxsize)
+            self._items.append(call)
+            if not self._running:
+                self._running = True
+                self.executor.submit(self._drain)
+
+    def _drain(self):
+        while True:
+            with self._condition:
+                if not self._items:
+                    self._running = False
+                    self._condition.notify_all()
+                    return
+                call = self._items.popleft()
+                self._condition.notify_all()
+            try:
+                _call_handler(call, self.handler, active_metrics())
+            except Exception:
+                LOG.exception('Handler %r failed', self.handler)
+
+    def join(self):
+        with self._condition:
+            self._condition.wait_for(
+                lambda: not self._items and not self._running)
+
+
 class Emitter:
+    '''
+    Dispatches warnings and data to all registered handlers.
 
-    def __init__(self):
-            self.handlers = set()
+    By default, handlers are called one after the other on the caller's
+    thread. If *workers* is given, the handlers are called on a pool of that
+    many threads instead. Each handler then has its own queue (holding at most
+    *queue_size* calls if given) and receives the calls in order. *overflow*
+    (see :py:class:`Overflow`) defines what happens if a queue is full.
+    '''
+
+    def __init__(self, workers=None, queue_size=None,
+                 overflow=Overflow.BLOCK):
+        self.handlers = set()
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self._queues = {}
+        self._executor = None
+        if workers:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(
+                workers, thread_name_prefix='pollux-emitter')
 
     def add_handler(self, handler):
         self.handlers.add(handler)
+        if self._executor and handler not in self._queues:
+            self._queues[handler] = _HandlerQueue(
+                handler, self._executor, self.queue_size, self.overflow)
+
+    def _dispatch(self, call):
+        if self._executor is None:
+            metrics = active_metrics()
+            if not metrics.enabled:
+                for handler in self.handlers:
+                    call(handler)
+                return
+            for handler in self.handlers:
+                _call_handler(call, handler, metrics)
+        else:
+            for handler in self.handlers:
+                self._queues[handler].put(call)
 
     def warn(self, pollen_family, symptom_strength):
-        for handler in self.handlers:
-            handler.handle(pollen_family, symptom_strength)
+        self._dispatch(methodcaller('handle', pollen_family, symptom_strength))
+
+    def warn_batch(self, date, warnings):
+        '''
+        Pass all *warnings* for *date* (as returned by
+        :py:func:`pollux.warnings`) to the handlers in one call (see
+        :py:func:`deliver_batch`).
+        '''
+        self._dispatch(partial(deliver_batch, date=date, warnings=warnings))
+
+    def send_digests(self, date, digests):
+        '''
+        Pass a batch of subscriber *digests* for *date* to the handlers (see
+        :py:func:`deliver_digests`).
+        '''
+        self._dispatch(partial(deliver_digests, date=date, digests=digests))
 
     def disseminate(self, date, values):
         output = {
             'date': date,
             'values': values
         }
-        for handler in self.handlers:
-            handler.handle_raw_data(output)
+        self._dispatch(methodcaller('handle_raw_data', output))
+
+    @property
+    def dropped(self):
+        '''
+        Number of calls discarded because a handler queue was full.
+        '''
+        return sum(queue.dropped for queue in self._queues.values())
+
+    def flush(self):
+        '''
+        Wait until all queued calls have been handled.
+        '''
+        for queue in list(self._queues.values()):
+            queue.join()
+
+    def close(self):
+        '''
+        Handle all queued calls and stop the worker threads.
+        '''
+        self.flush()
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,260 @@
+'''
+Forecasts of pollen counts and warnings for the coming days.
+
+:py:class:`Forecaster` keeps two lightweight models per genus, both updated
+incrementally as :py:class:`pollux.model.Datum` rows arrive:
+
+* a day-of-year climatology: the mean count of each calendar day over all
+  years, smoothed over a window of neighbouring days, and
+* an exponentially smoothed level of the most recent counts.
+
+The forecast for a day is its climatology plus the current anomaly (the
+level minus the climatology of the last observed day), damped towards zero
+with every day ahead. Genera without climatology for a day fall back to
+the damped level.
+
+The forecasts are classified with the default
+:py:class:`pollux.classifier.Classifier` and can be passed to the handlers of
+an :py:class:`pollux.emitter.Emitter` like observed warnings::
+
+    forecaster = Forecaster()
+    forecaster.update(history)
+    emitter.add_handler(forecaster)  # keep learning from new data
+    forecaster.publish(emitter, date.today() + timedelta(days=1), days=3)
+'''
+from array import array
+from datetime import date as makedate, timedelta
+from os import replace
+import json
+import logging
+
+from .classifier import default as default_classifier
+
+LOG = logging.getLogger(__name__)
+
+#: Number of day-of-year slots (the 29th of February has its own slot).
+SLOTS = 366
+
+#: Number of days before the last observed day whose values may still be
+#: corrected by default.
+DEFAULT_CORRECTIONS = 14
+
+
+def day_of_year(date):
+    '''
+    Return the slot of *date* in the climatology (0 to 365). The slots
+    follow a leap year so that calendar days line up across years.
+    '''
+    return makedate(2000, date.month, date.day).timetuple().tm_yday - 1
+
+
+class _Model:
+    '''
+    Per-genus parameters: windowed sums and counts of the values by day of
+    year, the smoothed level and the values of the days which may still be
+    corrected.
+    '''
+
+    __slots__ = ('sums', 'counts', 'level', 'previous', 'last', 'values')
+
+    def __init__(self):
+        self.sums = array('d', bytes(8 * SLOTS))
+        self.counts = array('i', bytes(4 * SLOTS))
+        self.level = None
+        self.previous = None
+        self.last = None
+        self.values = {}
+
+    def update(self, ordinal, value, window, alpha, corrections):
+        old = self.values.get(ordinal)
+        if old == value:
+            return
+        if old is None and self.last is not None and (
+                ordinal <= self.last - corrections):
+            LOG.debug('Ignoring value of %s: too old to be corrected',
+                      makedate.fromordinal(ordinal))
+            return
+        self.values[ordinal] = value
+        slot = day_of_year(makedate.fromordinal(ordinal))
+        delta, count = (value, 1) if old is None else (value - old, 0)
+        for offset in range(-window, window + 1):
+            index = (slot + offset) % SLOTS
+            self.sums[index] += delta
+            self.counts[index] += count
+
+        if self.last is None or ordinal > self.last:
+            self.previous = self.level
+            self.last = ordinal
+            for old in [key for key in self.values
+                        if key <= ordinal - corrections]:
+                del self.values[old]
+        elif ordinal < self.last:
+            return
+        if self.previous is None:
+            self.level = float(value)
+        else:
+            self.level = alpha * value + (1 - alpha) * self.previous
+
+    def climatology(self, slot):
+        count = self.counts[slot]
+        return self.sums[slot] / count if count else None
+
+    def to_dict(self):
+        return {
+            'sums': list(self.sums),
+            'counts': list(self.counts),
+            'level': self.level,
+            'previous': self.previous,
+            'last': self.last,
+            'values': sorted(self.values.items()),
+        }
+
+    @classmethod
+    def from_dict(cls, raw):
+        model = cls()
+        model.sums = array('d', raw['sums'])
+        model.counts = array('i', raw['counts'])
+        model.level = raw['level']
+        model.previous = raw['previous']
+        model.last = raw['last']
+        model.values = dict(raw['values'])
+        return model
+
+
+class Forecaster:
+    '''
+    :param alpha: Smoothing factor of the level (0 to 1). Higher values
+        follow the most recent counts more closely.
+    :param damping: Factor by which the anomaly shrinks with each day ahead.
+    :param window: Number of days before and after a calendar day which are
+        included in its climatology.
+    :param corrections: Number of days before the last observed day of a
+        genus whose values may still be corrected. Older values are not kept
+        in the models and new rows for those days are ignored.
+
+    The forecaster is an emitter handler: disseminated data updates the
+    models. The instance is not thread-safe; use it from one thread or an
+    emitter queue.
+    '''
+
+    def __init__(self, alpha=0.5, damping=0.7, window=3,
+                 corrections=DEFAULT_CORRECTIONS):
+        self.alpha = alpha
+        self.damping = damping
+        self.window = window
+        self.corrections = corrections
+        self.models = {}
+
+    def handle(self, pollen_family, symptom_strength):
+        pass
+
+    def handle_raw_data(self, data):
+        self.update(data['values'])
+
+    def update(self, data):
+        '''
+        Update the models with an iterable of :py:class:`Datum` instances
+        (for example the stored history). Rows are applied in chronological
+        order. A row for a day already seen replaces the earlier value.
+        '''
+        for datum in sorted(data):
+            model = self.models.get(datum.lname)
+            if model is None:
+                model = self.models[datum.lname] = _Model()
+            model.update(datum.date.toordinal(), datum.value, self.window,
+                         self.alpha, self.corrections)
+
+    def since(self):
+        '''
+        Return the first date whose rows may still change the models (the
+        oldest date which may be corrected), or ``None`` if there are no
+        models yet. Updating a restored forecaster with the rows from this
+        date on is enough to bring it up to date.
+        '''
+        lasts = [model.last for model in self.models.values()
+                 if model.last is not None]
+        if not lasts:
+            return None
+        return makedate.fromordinal(min(lasts) - self.corrections + 1)
+
+    def predict(self, start, days=1, genera=None):
+        '''
+        Return a dictionary mapping genus names (all genera with data or
+        *genera*) to the list of forecast counts for the *days* days
+        beginning on *start*. The anomaly is not damped for days on or
+        before the last observed day.
+        '''
+        slots = [day_of_year(start + timedelta(days=offset))
+                 for offset in range(days)]
+        first = start.toordinal()
+        output = {}
+        for lname in (self.models if genera is None else genera):
+            model = self.models.get(lname)
+            if model is None or model.level is None:
+                continue
+            base = model.climatology(day_of_year(
+                makedate.fromordinal(model.last)))
+            anomaly = model.level - (base or 0.0)
+            ahead = first - model.last
+            sums, counts = model.sums, model.counts
+            output[lname] = [
+                max(0.0, (sums[slot] / counts[slot] if counts[slot] else 0.0) +
+                    anomaly * self.damping ** max(0, ahead + offset))
+                for offset, slot in enumerate(slots)]
+        return output
+
+    def forecast_warnings(self, start, days=1, genera=None):
+        '''
+        Return the warnings expected for the *days* days beginning on
+        *start*, in the format of :py:func:`pollux.warnings_range`.
+        '''
+        classifier = default_classifier()
+        output = {start + timedelta(days=offset): {}
+                  for offset in range(days)}
+        dates = sorted(output)
+        for lname, values in self.predict(start, days, genera).items():
+            key = lname.lower()
+            for date, value in zip(dates, values):
+                strength = classifier.classify(lname, round(value))
+                if strength is not None:
+                    output[date][key] = strength
+        return output
+
+    def publish(self, emitter, start, days=1):
+        '''
+        Pass the forecast warnings of each day to ``emitter.warn_batch``.
+        Returns the forecast warnings.
+        '''
+        output = self.forecast_warnings(start, days)
+        for date, found in sorted(output.items()):
+            emitter.warn_batch(date, found)
+        return output
+
+    def save(self, path):
+        '''
+        Store the model parameters in the JSON file *path*.
+        '''
+        raw = {
+            'alpha': self.alpha,
+            'damping': self.damping,
+            'window': self.window,
+            'corrections': self.corrections,
+            'models': {lname: model.to_dict()
+                       for lname, model in self.models.items()},
+        }
+        with open(path + '.tmp', 'w', encoding='utf8') as fptr:
+            json.dump(raw, fptr)
+        replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Restore a forecaster stored with :py:meth:`save`.
+        '''
+        with open(path, encoding='utf8') as fptr:
+            raw = json.load(fptr)
+        forecaster = cls(raw['alpha'], raw['damping'], raw['window'],
+                         raw.get('corrections', DEFAULT_CORRECTIONS))
+        forecaster.models = {lname: _Model.from_dict(model)
+                             for lname, model in raw['models'].items()}
+        return forecaster
@@ -0,0 +1,192 @@
+'''
+Compact, column-oriented storage of pollen counts.
+
+A :py:class:`PollenFrame` holds the same information as a set of
+:py:class:`pollux.model.Datum` instances in three :py:class:`array.array`
+columns: the dates as day ordinals (see :py:meth:`datetime.date.toordinal`),
+the genera as small integer codes and the counts. The columns support the
+buffer protocol, so they can be wrapped without copying using
+:py:class:`memoryview` or ``numpy.frombuffer``.
+'''
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date as makedate
+from threading import Lock
+
+from .data import GENERA
+from .model import Datum
+
+#: Genus name for each genus code. Pre-populated with the names of
+#: :py:data:`pollux.data.GENERA` as they appear on pollen.lu. Unknown names
+#: are appended by :py:func:`genus_code`, spelled as first seen.
+GENUS_NAMES = [name.capitalize() for name in sorted(GENERA)]
+
+#: Genus code for each lower-case genus name (the reverse of
+#: :py:data:`GENUS_NAMES`).
+GENUS_CODES = {name.lower(): code for code, name in enumerate(GENUS_NAMES)}
+
+_REGISTRY_LOCK = Lock()
+
+DATE_TYPECODE = 'i'
+GENUS_TYPECODE = 'H'
+VALUE_TYPECODE = 'i'
+
+
+def genus_code(name):
+    '''
+    Return the integer code of the genus *name*, assigning a new code if the
+    name has not been seen before. Names are case-insensitive: ``'betula'``
+    and ``'Betula'`` share one code.
+    '''
+    key = name.lower()
+    try:
+        return GENUS_CODES[key]
+    except KeyError:
+        pass
+    with _REGISTRY_LOCK:
+        code = GENUS_CODES.get(key)
+        if code is None:
+            # the name is appended first so that a code is never visible
+            # before its name
+            GENUS_NAMES.append(name)
+            code = GENUS_CODES[key] = len(GENUS_NAMES) - 1
+        return code
+
+
+class PollenFrame:
+    '''
+    Column-oriented collection of pollen counts.
+
+    Rows are kept sorted by date and genus code if they are added using
+    :py:meth:`from_data` or :py:meth:`extend`, which allows selecting dates
+    by binary search. Genus names are stored as codes (see
+    :py:func:`genus_code`), so rows read back carry the spelling of
+    :py:data:`GENUS_NAMES` (``'betula'`` comes back as ``'Betula'``).
+    '''
+
+    def __init__(self, dates=None, genera=None, values=None):
+        self.dates = array(DATE_TYPECODE, dates or [])
+        self.genera = array(GENUS_TYPECODE, genera or [])
+        self.values = array(VALUE_TYPECODE, values or [])
+        if not len(self.dates) == len(self.genera) == len(self.values):
+            raise ValueError('All columns must have the same length')
+        self.is_sorted = all(
+            key <= next_key for key, next_key in zip(self._keys(),
+                                                     self._keys(1)))
+
+    def _keys(self, start=0):
+        return zip(self.dates[start:], self.genera[start:])
+
+    @classmethod
+    def from_data(cls, data):
+        '''
+        Create a new frame from an iterable of :py:class:`Datum` instances.
+        '''
+        frame = cls()
+        frame.extend(data)
+        return frame
+
+    def extend(self, data):
+        '''
+        Add all :py:class:`Datum` instances from *data*.
+        '''
+        rows = sorted((datum.date.toordinal(), genus_code(datum.lname),
+                       datum.value) for datum in data)
+        if not rows:
+            return
+        if self.is_sorted and len(self) and rows[0][:2] < (
+                self.dates[-1], self.genera[-1]):
+            self.is_sorted = False
+        dates, genera, values = zip(*rows)
+        self.dates.extend(dates)
+        self.genera.extend(genera)
+        self.values.extend(values)
+
+    def append(self, datum):
+        self.extend([datum])
+
+    def sort(self):
+        '''
+        Sort the rows by date and genus.
+        '''
+        if self.is_sorted:
+            return
+        rows = sorted(zip(self.dates, self.genera, self.values))
+        self.dates, self.genera, self.values = self._columns(rows)
+        self.is_sorted = True
+
+    @staticmethod
+    def _columns(rows):
+        dates = array(DATE_TYPECODE)
+        genera = array(GENUS_TYPECODE)
+        values = array(VALUE_TYPECODE)
+        for date, genus, value in rows:
+            dates.append(date)
+            genera.append(genus)
+            values.append(value)
+        return dates, genera, values
+
+    def _range(self, start, end):
+        '''
+        Return the index range of rows between the ordinals *start* and *end*
+        (inclusive).
+        '''
+        self.sort()
+        return (bisect_left(self.dates, start),
+                bisect_right(self.dates, end))
+
+    def select(self, start=None, end=None, genera=None):
+        '''
+        Return a new frame containing only the rows from *start* to *end*
+        (both inclusive, as :py:class:`datetime.date`) and of the genus names
+        in *genera*. Genus names are case-insensitive (see
+        :py:func:`genus_code`).
+        '''
+        low, high = self._range(
+            start.toordinal() if start else 0,
+            end.toordinal() if end else makedate.max.toordinal())
+        dates = self.dates[low:high]
+        codes = self.genera[low:high]
+        values = self.values[low:high]
+        if genera is None:
+            return PollenFrame(dates, codes, values)
+        wanted = {GENUS_CODES[name.lower()] for name in genera
+                  if name.lower() in GENUS_CODES}
+        return PollenFrame(*self._columns(
+            row for row in zip(dates, codes, values) if row[1] in wanted))
+
+    def on(self, date):
+        '''
+        Return the rows for one date.
+        '''
+        return self.select(date, date)
+
+    def to_data(self):
+        '''
+        Convert the frame back to a set of :py:class:`Datum` instances.
+        '''
+        return set(self)
+
+    def __iter__(self):
+        fromordinal = makedate.fromordinal
+        for date, genus, value in zip(self.dates, self.genera, self.values):
+            yield Datum(fromordinal(date), GENUS_NAMES[genus], value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __eq__(self, other):
+        if not isinstance(other, PollenFrame):
+            return NotImplemented
+        return self.to_data() == other.to_data()
+
+    def __repr__(self):
+        return '<PollenFrame %d rows>' % len(self)
+
+    @property
+    def nbytes(self):
+        '''
+        Memory used by the column data.
+        '''
+        return sum(column.itemsize * len(column)
+                   for column in (self.dates, self.genera, self.values))
@@ -0,0 +1,198 @@
+'''
+Persistent on-disk cache for the pollen.lu pages.
+
+:py:class:`HttpCache` wraps the object normally passed as ``httplib`` to
+:py:class:`pollux.Probe` and exposes the same ``get`` method. Responses are
+stored on disk keyed by the site (host and path) and the ``(year, week)`` of
+the requested page. Pages of
+finished weeks never change and are served from disk without contacting the
+server. Pages of the current week are revalidated using conditional requests
+(``ETag``/``Last-Modified``).
+'''
+from datetime import date
+from hashlib import sha1
+from os import getpid, makedirs, replace, scandir, unlink, utime
+from os.path import join
+from threading import get_ident
+from urllib.parse import parse_qs, urlparse
+import json
+import logging
+
+from . import week_end
+
+LOG = logging.getLogger(__name__)
+
+
+class CacheMiss(LookupError):
+    '''
+    Raised by an offline cache when a page has not been cached before.
+    '''
+
+
+class CachedResponse:
+    '''
+    Minimal stand-in for a ``requests`` response replayed from the cache.
+    '''
+
+    def __init__(self, content, encoding=None, headers=None, status_code=200):
+        self.content = content
+        self.encoding = encoding
+        self.headers = headers or {}
+        self.status_code = status_code
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'latin1', 'replace')
+
+
+def page_key(url):
+    '''
+    Return the ``(site, year, week)`` key of a weekly data page URL or
+    ``None`` if *url* is not such a page. *site* is a short hash of the host
+    and path, so that the pages of different sources do not collide.
+    '''
+    parts = urlparse(url)
+    query = parse_qs(parts.query)
+    try:
+        year, week = query['year'][0], query['week'][0]
+    except (KeyError, IndexError):
+        return None
+    site = (parts.netloc.lower() + parts.path).encode('utf8')
+    return sha1(site).hexdigest()[:12], year, week
+
+
+class HttpCache:
+    '''
+    :param httplib: The object used to make the HTTP requests (for example
+        the ``requests`` module or a ``requests.Session``).
+    :param directory: The folder containing the cached responses.
+    :param max_size: If given, the least recently used responses are removed
+        as soon as the cached bodies exceed this many bytes.
+    :param offline: Never access the network. Cached pages are returned as-is
+        and a :py:exc:`CacheMiss` is raised for all others.
+    :param today: Callable returning the current date. Used to decide
+        whether a week is finished.
+    '''
+
+    def __init__(self, httplib, directory, max_size=None, offline=False,
+                 today=date.today):
+        self.httplib = httplib
+        self.directory = directory
+        self.max_size = max_size
+        self.offline = offline
+        self.today = today
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        makedirs(directory, exist_ok=True)
+
+    def _paths(self, key):
+        basename = join(self.directory, '%s-%s-%s' % key)
+        return basename + '.html', basename + '.json'
+
+    def load(self, key):
+        '''
+        Return the cached ``(body, metadata)`` for *key* or ``None``.
+        '''
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, encoding='utf8') as fptr:
+                meta = json.load(fptr)
+            with open(body_path, 'rb') as fptr:
+                body = fptr.read()
+        except (OSError, ValueError):
+            return None
+        try:
+            utime(body_path)  # used as "last access" for the LRU eviction
+        except FileNotFoundError:
+            pass  # evicted meanwhile by another thread
+        return body, meta
+
+    def store(self, key, response, url):
+        body_path, meta_path = self._paths(key)
+        headers = response.headers or {}
+        meta = {
+            'url': url,
+            'encoding': response.encoding,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+        }
+        # unique per writer, as the cache may be shared between threads
+        suffix = '.%d-%d.tmp' % (getpid(), get_ident())
+        for path, mode, content in ((body_path, 'wb', response.content),
+                                    (meta_path, 'w', json.dumps(meta))):
+            with open(path + suffix, mode) as fptr:
+                fptr.write(content)
+            replace(path + suffix, path)
+        if self.max_size is not None:
+            self.evict(self.max_size)
+
+    def is_final(self, key):
+        '''
+        Whether the page for the ``(site, year, week)`` *key* can no longer
+        change.
+        '''
+        return week_end(key[1:]) < self.today()
+
+    def get(self, url, **kwargs):
+        key = page_key(url)
+        if key is None:
+            return self.httplib.get(url, **kwargs)
+
+        cached = self.load(key)
+        if cached and (self.offline or self.is_final(key)):
+            LOG.debug('Cache hit for %s', url)
+            self.hits += 1
+            return CachedResponse(cached[0], cached[1]['encoding'])
+        if self.offline:
+            raise CacheMiss(url)
+
+        if cached:
+            body, meta = cached
+            headers = dict(kwargs.pop('headers', None) or {})
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+            self.revalidations += 1
+            response = self.httplib.get(url, headers=headers, **kwargs)
+            if response.status_code == 304:
+                LOG.debug('Cached copy of %s is still valid', url)
+                self.hits += 1
+                return CachedResponse(body, meta['encoding'])
+            if response.status_code != 200:
+                LOG.warning('Unable to revalidate %s (HTTP %s). Using the '
+                            'cached copy.', url, response.status_code)
+                return CachedResponse(body, meta['encoding'])
+        else:
+            response = self.httplib.get(url, **kwargs)
+
+        self.misses += 1
+        if response.status_code == 200:
+            self.store(key, response, url)
+        return response
+
+    def evict(self, max_size):
+        '''
+        Remove the least recently used pages until the cached bodies take up
+        at most *max_size* bytes.
+        '''
+        entries = []
+        for entry in scandir(self.directory):
+            if entry.name.endswith('.html'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_size:
+                break
+            LOG.debug('Evicting %s from the cache', path)
+            for filename in (path, path[:-len('.html')] + '.json'):
+                try:
+                    unlink(filename)
+                except FileNotFoundError:
+                    pass  # evicted by another thread
+            total -= size
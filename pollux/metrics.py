@@ -0,0 +1,171 @@
+'''
+Timers and counters for the hot paths of pollux.
+
+Instrumented code fetches the active metrics registry with :py:func:`active`
+and records durations with ``timer()`` and events with ``increment()``. By
+default, the registry is a :py:class:`NullMetrics` instance which records
+nothing. Call :py:func:`install` with a :py:class:`Metrics` instance (or any
+object with the same interface) to start recording::
+
+    metrics = install(Metrics())
+    probe.execute(date.today())
+    print(metrics.to_prometheus())
+'''
+from threading import Lock
+from time import perf_counter
+import json
+
+
+class _NullTimer:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class NullMetrics:
+    '''
+    Metrics registry which records nothing.
+    '''
+
+    enabled = False
+
+    def timer(self, name, **labels):
+        return _NULL_TIMER
+
+    def increment(self, name, value=1, **labels):
+        pass
+
+    def observe(self, name, seconds, **labels):
+        pass
+
+
+class _Timer:
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.metrics.observe(self.name, perf_counter() - self.start,
+                             **self.labels)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (key, _escape(value))
+                             for key, value in labels)
+
+
+class Metrics:
+    '''
+    Metrics registry keeping counters and timer summaries (count, sum and
+    maximum of the durations, in seconds) in memory.
+    '''
+
+    enabled = True
+
+    def __init__(self):
+        self.counters = {}
+        self.timers = {}
+        self._lock = Lock()
+
+    def timer(self, name, **labels):
+        '''
+        Return a context manager recording the duration of its block.
+        '''
+        return _Timer(self, name, labels)
+
+    def observe(self, name, seconds, **labels):
+        key = name, tuple(sorted(labels.items()))
+        with self._lock:
+            count, total, maximum = self.timers.get(key, (0, 0.0, 0.0))
+            self.timers[key] = count + 1, total + seconds, max(maximum,
+                                                               seconds)
+
+    def increment(self, name, value=1, **labels):
+        key = name, tuple(sorted(labels.items()))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.timers.clear()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(
+                        self.counters.items())],
+                'timers': [
+                    {'name': name, 'labels': dict(labels), 'count': count,
+                     'sum': total, 'max': maximum}
+                    for (name, labels), (count, total, maximum) in sorted(
+                        self.timers.items())],
+            }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        '''
+        Return the metrics in the Prometheus text exposition format.
+        Timers are exported as summaries, counters as counters.
+        '''
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            timers = sorted(self.timers.items())
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append('# TYPE %s counter' % name)
+            lines.append('%s%s %s' % (name, _format_labels(labels), value))
+        for (name, labels), (count, total, _) in timers:
+            if name not in seen:
+                seen.add(name)
+                lines.append('# TYPE %s summary' % name)
+            formatted = _format_labels(labels)
+            lines.append('%s_count%s %d' % (name, formatted, count))
+            lines.append('%s_sum%s %r' % (name, formatted, total))
+        return '\n'.join(lines) + '\n'
+
+
+_ACTIVE = NullMetrics()
+
+
+def active():
+    '''
+    Return the active metrics registry.
+    '''
+    return _ACTIVE
+
+
+def install(metrics):
+    '''
+    Make *metrics* the active registry and return it. Pass ``None`` to
+    disable recording again.
+    '''
+    global _ACTIVE
+    _ACTIVE = metrics if metrics is not None else NullMetrics()
+    return _ACTIVE
@@ -0,0 +1,203 @@
+'''
+Backends which extract the raw cell texts of the data table from a pollen.lu
+page.
+
+Each backend is a callable taking the HTML document and returning a list of
+rows, each row being the list of cell texts (``<td>`` elements) of that row.
+The rows are the ``<tr>`` elements found (recursively) in the sixth table of
+the document, in document order.
+'''
+from html import unescape
+from re import DOTALL, IGNORECASE, compile
+import logging
+
+LOG = logging.getLogger(__name__)
+
+#: Index of the table containing the pollen counts on a pollen.lu page.
+TABLE_INDEX = 5
+
+#: Matches table start tags, skipping over comments, CDATA sections and
+#: raw-text elements which the HTML tokenizer would not interpret as markup
+#: either.
+P_TABLE_START = compile(
+    r'<!--.*?-->|<!\[CDATA\[.*?\]\]>|<(script|style)\b.*?</\1\s*>|(<table\b)',
+    DOTALL | IGNORECASE)
+
+#: Matches comments, declarations (like ``<!DOCTYPE>``), processing
+#: instructions, CDATA sections and tags. Group 1 is the content of a CDATA
+#: section, group 2 the closing slash of an end tag (if any) and group 3 the
+#: tag name.
+P_TAG = compile(
+    r'<!--.*?-->|<!\[CDATA\[(.*?)\]\]>|<[!?][^>]*>'
+    r'|<(/?)([a-zA-Z][^\s/>]*)(?:"[^"]*"|\'[^\']*\'|[^\'">])*>',
+    DOTALL)
+
+#: Matches the end of raw text elements, whose content is not markup.
+P_RAW_TEXT_END = {
+    'script': compile(r'</script', IGNORECASE),
+    'style': compile(r'</style', IGNORECASE),
+}
+
+
+class TableNotFound(ValueError):
+    '''
+    Raised when a document does not contain the requested table.
+    '''
+
+
+class TableExtractor:
+    '''
+    Event-based extractor for the cells of one table.
+
+    Mirrors what ``BeautifulSoup.find_all('table')[index].find_all('tr')``
+    followed by ``row.find_all('td')`` yields: each row contains *all* cells
+    found below it (including cells of nested tables) and the text of a cell
+    includes the text of all its descendants. The markup before the table is
+    skipped without being tokenized, and tokenizing stops as soon as the table
+    is closed.
+
+    Tokenizing is done with a small regular-expression scanner instead of
+    :py:class:`html.parser.HTMLParser` which is too slow for this purpose.
+    Tags in the table are assumed to be well-formed.
+    '''
+
+    def __init__(self, index=TABLE_INDEX):
+        self.index = index
+        self.rows = []
+        self._stack = []  # open table/tr/td elements inside the target table
+        self._open_rows = []
+        self._open_cells = []
+
+    def handle_starttag(self, tag):
+        if tag == 'table':
+            self._stack.append(tag)
+        elif tag == 'tr':
+            row = []
+            self.rows.append(row)
+            self._open_rows.append(row)
+            self._stack.append(tag)
+        elif tag == 'td':
+            cell = []
+            for row in self._open_rows:
+                row.append(cell)
+            self._open_cells.append(cell)
+            self._stack.append(tag)
+
+    def handle_endtag(self, tag):
+        # Like BeautifulSoup, an end tag closes all elements opened after the
+        # matching start tag, and is ignored if no such element is open.
+        if tag not in self._stack:
+            return
+        while True:
+            closed = self._stack.pop()
+            if closed == 'tr':
+                self._open_rows.pop()
+            elif closed == 'td':
+                self._open_cells.pop()
+            if closed == tag:
+                break
+
+    def handle_data(self, data):
+        for cell in self._open_cells:
+            cell.append(data)
+
+    def _locate(self, data):
+        '''
+        Return the offset of the start tag of the requested table in *data*.
+        '''
+        seen_tables = 0
+        for match in P_TABLE_START.finditer(data):
+            if not match.group(2):
+                continue
+            if seen_tables == self.index:
+                return match.start()
+            seen_tables += 1
+        raise TableNotFound('Document only contains %d tables' %
+                            seen_tables)
+
+    def extract(self, data):
+        match = P_TAG.match(data, self._locate(data))
+        if match.group(0).endswith('/>'):
+            return []  # <table/>
+        self.handle_starttag('table')
+        position = match.end()
+        while self._stack:
+            match = P_TAG.search(data, position)
+            if not match:
+                break
+            if self._open_cells and match.start() > position:
+                text = data[position:match.start()]
+                self.handle_data(unescape(text) if '&' in text else text)
+            position = match.end()
+            tag = match.group(3)
+            if not tag:
+                # CDATA is text, comments and declarations are skipped
+                if match.group(1) and self._open_cells:
+                    self.handle_data(match.group(1))
+                continue
+            tag = tag.lower()
+            if match.group(2):
+                self.handle_endtag(tag)
+            elif tag in P_RAW_TEXT_END:
+                end = P_RAW_TEXT_END[tag].search(data, position)
+                position = end.start() if end else len(data)
+            else:
+                self.handle_starttag(tag)
+                if match.group(0).endswith('/>'):
+                    # self-closing tags like <td/> are empty elements
+                    self.handle_endtag(tag)
+        return [[''.join(cell) for cell in row] for row in self.rows]
+
+
+def stream_rows(data):
+    '''
+    Extract the table rows using the streaming :py:class:`TableExtractor`.
+    '''
+    return TableExtractor().extract(data)
+
+
+def soup_rows(data):
+    '''
+    Extract the table rows by building a complete BeautifulSoup tree.
+    '''
+    # bs4 takes longer to import than most pages take to parse with the
+    # stream backend, so it is only imported when this backend is used.
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(data, 'html.parser')
+    tables = soup.find_all('table')
+    if len(tables) <= TABLE_INDEX:
+        raise TableNotFound('Document only contains %d tables' % len(tables))
+    return [[cell.text for cell in row.find_all('td')]
+            for row in tables[TABLE_INDEX].find_all('tr')]
+
+
+#: Available parser backends, by name.
+ENGINES = {
+    'stream': stream_rows,
+    'soup': soup_rows,
+}
+
+#: Backend used when none is requested explicitly.
+DEFAULT_ENGINE = 'stream'
+
+#: Backend used when the requested one fails to process a document.
+FALLBACK_ENGINE = 'soup'
+
+
+def extract_rows(data, engine=None):
+    '''
+    Return the rows of the data table in *data* using the backend named
+    *engine* (defaults to :py:data:`DEFAULT_ENGINE`).
+
+    If the backend fails, the document is processed again using
+    :py:data:`FALLBACK_ENGINE`.
+    '''
+    engine = engine or DEFAULT_ENGINE
+    try:
+        return ENGINES[engine](data)
+    except Exception:
+        if engine == FALLBACK_ENGINE:
+            raise
+        LOG.warning('Parser engine %r failed. Falling back to %r',
+                    engine, FALLBACK_ENGINE, exc_info=True)
+        return ENGINES[FALLBACK_ENGINE](data)
@@ -0,0 +1,125 @@
+'''
+Streaming pipeline from download to emission.
+
+Each stage is a generator consuming the previous one, so only one page and
+the rows of one date are held in memory at any time, however many weeks are
+processed::
+
+    pages = fetch(requests, week_keys(start, end))
+    data = between(rows(pages), start, end)
+    emit(classified(data), emitter)
+
+Like :py:meth:`pollux.Probe.execute_range`, the emitter receives the complete
+set of rows of each date in one ``disseminate`` call.
+
+:py:func:`stream_range` builds this pipeline for a :py:class:`pollux.Probe`.
+If the emitter uses worker threads, give it a *queue_size* so that slow
+handlers hold back the download of further pages instead of letting the
+queues grow.
+'''
+from itertools import groupby
+from operator import attrgetter
+import logging
+
+from . import Probe, daterange, iter_parse, week_key
+from .classifier import default as default_classifier
+from .metrics import active as active_metrics
+from .model import SymptomStrength
+
+LOG = logging.getLogger(__name__)
+
+
+def week_keys(start, end):
+    '''
+    Yield the ``(year, week)`` keys of the pages covering *start* to *end*.
+    '''
+    for key, _ in groupby(daterange(start, end), week_key):
+        yield key
+
+
+def fetch(httplib, keys, url=None):
+    '''
+    Download the page of each ``(year, week)`` key in *keys* and yield
+    ``(key, text)`` tuples. The next page is only requested once the
+    previous one was consumed.
+
+    :param url: Callable returning the URL of a key. Defaults to
+        :py:meth:`pollux.Probe.url`.
+    '''
+    url = url or Probe(httplib, None).url
+    for key in keys:
+        with active_metrics().timer('pollux_probe_http_seconds'):
+            response = httplib.get(url(key))
+        yield key, response.text
+
+
+def rows(pages, engine=None):
+    '''
+    Yield the :py:class:`pollux.model.Datum` instances of each ``(key,
+    text)`` page in *pages* (see :py:func:`pollux.iter_parse`). The rows of
+    a page are sorted by date, so that the rows of each date are
+    consecutive.
+    '''
+    for key, text in pages:
+        LOG.debug('Parsing page %r', key)
+        yield from sorted(iter_parse(text, engine), key=attrgetter('date'))
+
+
+def between(data, start=None, end=None):
+    '''
+    Yield the rows of *data* from *start* to *end* (both inclusive).
+    '''
+    for datum in data:
+        if (start is None or datum.date >= start) and (
+                end is None or datum.date <= end):
+            yield datum
+
+
+def classified(data):
+    '''
+    Yield ``(datum, strength)`` tuples for the rows of *data*, where
+    *strength* is the :py:class:`pollux.model.SymptomStrength` the row would
+    have in :py:func:`pollux.warnings` (``None`` if it raises no warning).
+    '''
+    classifier = default_classifier()
+    for datum in data:
+        strength = classifier.classify(datum.lname, datum.value)
+        if strength == SymptomStrength.ERROR:
+            LOG.warning('Illegal value: %r', datum)
+        yield datum, strength
+
+
+def emit(items, emitter):
+    '''
+    Pass the ``(datum, strength)`` tuples of *items* (see
+    :py:func:`classified`) to *emitter*, one date at a time.
+
+    The rows of each date are passed to ``disseminate`` and its warnings to
+    ``warn_batch``, each in one call. *items* must yield the rows of a date
+    consecutively (as :py:func:`rows` does). Returns the number of rows
+    emitted.
+    '''
+    count = 0
+    for date, group in groupby(items, lambda item: item[0].date):
+        values = set()
+        found = {}
+        for datum, strength in group:
+            values.add(datum)
+            if strength is not None:
+                found[datum.lname.lower()] = strength
+        emitter.disseminate(date, values)
+        if found:
+            emitter.warn_batch(date, found)
+        count += len(values)
+    return count
+
+
+def stream_range(probe, start, end, engine=None):
+    '''
+    Fetch, parse, classify and emit the data from *start* to *end* using the
+    HTTP library, URLs and emitter of *probe*, one page at a time. Returns
+    the number of rows emitted.
+    '''
+    pages = fetch(probe.httplib, week_keys(start, end), probe.url)
+    data = between(rows(pages, engine), start, end)
+    return emit(classified(data), probe.emitlib)
@@ -0,0 +1,284 @@
+'''
+Probing several data sources in parallel.
+
+A source adapter (a :py:class:`Source`) knows how to build the URL of a page
+of its site and how to parse that page into :py:class:`pollux.model.Datum`
+instances. Adapters are registered by name in :py:data:`SOURCES`. The
+pollen.lu data page is available as ``"pollen.lu"``.
+
+:py:class:`MultiProbe` fetches the pages of all sources concurrently over
+one shared HTTP library (for example a pooled session from
+:py:func:`pollux.daemon.make_session`) and merges the results into a
+:py:class:`SourceStore`, keyed by source, date and genus::
+
+    class MirrorSource(PollenLuSource):
+        name = 'mirror'
+
+    register(MirrorSource('https://mirror.example/index.php'))
+    probe = MultiProbe(make_session(pool_size=8), ['pollen.lu', 'mirror'])
+    probe.execute(date.today())
+    probe.store.get(date.today())
+'''
+from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date as makedate
+from itertools import groupby
+from threading import Lock
+import logging
+
+from . import BASE_URL, daterange, page_url, parse, week_end, week_key
+from .cache import ParseMemo, PollenCache, index_by_date
+from .metrics import active as active_metrics
+from .model import Datum
+
+LOG = logging.getLogger(__name__)
+
+
+class Source(ABC):
+    '''
+    Base class of source adapters. Subclasses set :py:attr:`name` and
+    implement :py:meth:`url` and :py:meth:`parse`. Adapters missing either
+    method cannot be instantiated. By default, a source publishes one page
+    per week (see :py:func:`pollux.week_key`).
+    '''
+
+    #: Unique name of the source.
+    name = None
+
+    def keys(self, start, end):
+        '''
+        Return the keys of the pages covering the dates from *start* to
+        *end* (both inclusive).
+        '''
+        return [key for key, _ in groupby(daterange(start, end), week_key)]
+
+    @abstractmethod
+    def url(self, key):
+        '''
+        Return the URL of the page *key* (see :py:meth:`keys`).
+        '''
+
+    @abstractmethod
+    def parse(self, text):
+        '''
+        Return the :py:class:`pollux.model.Datum` instances found in the
+        page *text*.
+        '''
+
+    def is_final(self, key, today):
+        '''
+        Return whether the page *key* no longer changes, so that it may be
+        cached.
+        '''
+        return week_end(key) < today
+
+
+class PollenLuSource(Source):
+    '''
+    The weekly data page of pollen.lu.
+
+    :param base_url: URL of the page without query string.
+    :param engine: The parser backend (see :py:data:`pollux.parsing.ENGINES`).
+    '''
+
+    name = 'pollen.lu'
+
+    def __init__(self, base_url=BASE_URL, engine=None):
+        self.base_url = base_url
+        self.engine = engine
+
+    def url(self, key):
+        return page_url(key, self.base_url)
+
+    def parse(self, text):
+        return parse(text, self.engine)
+
+
+#: Registered source adapters, by name.
+SOURCES = {}
+
+
+def register(source):
+    '''
+    Register the source adapter *source* under its name and return it.
+    '''
+    if not source.name:
+        raise ValueError('Sources must have a name')
+    SOURCES[source.name] = source
+    return source
+
+
+def get_source(name):
+    try:
+        return SOURCES[name]
+    except KeyError:
+        raise KeyError('Unknown source %r. Known sources: %s' % (
+            name, ', '.join(sorted(SOURCES))))
+
+
+register(PollenLuSource())
+
+
+class SourceStore:
+    '''
+    Pollen counts of several sources, keyed by ``(source, date)`` and genus.
+    The store may be shared between threads.
+    '''
+
+    def __init__(self):
+        self.days = {}
+        self._lock = Lock()
+
+    def update(self, source, data):
+        '''
+        Store the :py:class:`pollux.model.Datum` instances *data* of the
+        source named *source*. Returns the set of rows which were new or
+        changed.
+        '''
+        changed = set()
+        with self._lock:
+            for datum in data:
+                day = self.days.setdefault((source, datum.date), {})
+                if day.get(datum.lname) != datum.value:
+                    day[datum.lname] = datum.value
+                    changed.add(datum)
+        return changed
+
+    def get(self, date, source=None):
+        '''
+        Return the values of *date* as dictionary mapping source names to
+        dictionaries mapping genus names to counts, optionally limited to
+        one *source*.
+        '''
+        names = [source] if source is not None else self.sources()
+        with self._lock:
+            return {name: dict(self.days[name, date]) for name in names
+                    if (name, date) in self.days}
+
+    def select(self, source, start=None, end=None):
+        '''
+        Return the :py:class:`pollux.model.Datum` instances of *source*
+        from *start* to *end*, sorted.
+        '''
+        start = start or makedate.min
+        end = end or makedate.max
+        with self._lock:
+            return sorted(Datum(date, lname, value)
+                          for (name, date), values in self.days.items()
+                          if name == source and start <= date <= end
+                          for lname, value in values.items())
+
+    def sources(self):
+        with self._lock:
+            return sorted({name for name, _ in self.days})
+
+
+class MultiProbe:
+    '''
+    Fetches the data of several sources in parallel.
+
+    :param httplib: Object providing a ``get(url)`` method (for example a
+        pooled :py:class:`requests.Session`), shared by all sources.
+    :param sources: Source adapters or names of registered adapters.
+        Defaults to all registered sources.
+    :param store: The :py:class:`SourceStore` receiving the merged data.
+    :param emitters: Optional dictionary mapping source names to the
+        :py:class:`pollux.emitter.Emitter` receiving the new or changed data
+        of that source.
+    :param workers: Maximum number of pages fetched at the same time.
+        Defaults to four per source.
+    :param today: Callable returning the current date.
+
+    Each source has its own :py:class:`pollux.cache.ParseMemo` and its own
+    :py:class:`pollux.cache.PollenCache` of final pages (see
+    :py:meth:`Source.is_final`).
+    '''
+
+    def __init__(self, httplib, sources=None, store=None, emitters=None,
+                 workers=None, today=makedate.today):
+        if sources is None:
+            sources = list(SOURCES.values())
+        self.httplib = httplib
+        self.sources = [get_source(source) if isinstance(source, str)
+                        else source for source in sources]
+        self.store = store if store is not None else SourceStore()
+        self.emitters = emitters or {}
+        self.today = today
+        self.memos = {source.name: ParseMemo() for source in self.sources}
+        self.caches = {source.name: PollenCache(max_entries=520)
+                       for source in self.sources}
+        self.failures = Counter()
+        self._executor = ThreadPoolExecutor(
+            workers or 4 * len(self.sources),
+            thread_name_prefix='pollux-source')
+
+    def fetch(self, source, key):
+        '''
+        Return the data of the page *key* of *source* indexed by date.
+        '''
+        cache = self.caches[source.name]
+        index = cache.get(key)
+        if index is not None:
+            return index
+        metrics = active_metrics()
+        with metrics.timer('pollux_source_http_seconds', source=source.name):
+            response = self.httplib.get(source.url(key))
+        raise_for_status = getattr(response, 'raise_for_status', None)
+        if raise_for_status:
+            raise_for_status()
+        memo = self.memos[source.name]
+        key_hash = memo.key(response.text)
+        data = memo.get(key_hash)
+        if data is None:
+            data = memo.put(key_hash, source.parse(response.text))
+        if source.is_final(key, self.today()):
+            return cache.put(key, data)
+        return index_by_date(data)
+
+    def execute_range(self, start, end):
+        '''
+        Fetch the data of all sources from *start* to *end* (both
+        inclusive). Returns the number of new or changed rows.
+
+        A source which fails is logged and counted in :py:attr:`failures`
+        and does not affect the other sources.
+        '''
+        futures = {}
+        for source in self.sources:
+            for key in source.keys(start, end):
+                future = self._executor.submit(self.fetch, source, key)
+                futures[future] = source, key
+        count = 0
+        for future in as_completed(futures):
+            source, key = futures[future]
+            try:
+                index = future.result()
+            except Exception:
+                self.failures[source.name] += 1
+                active_metrics().increment('pollux_source_failures_total',
+                                           source=source.name)
+                LOG.exception('Unable to fetch page %r of %s', key,
+                              source.name)
+                continue
+            rows = [datum for date, values in index.items()
+                    if start <= date <= end for datum in values]
+            changed = self.store.update(source.name, rows)
+            count += len(changed)
+            emitter = self.emitters.get(source.name)
+            if emitter is not None and changed:
+                for date, values in sorted(index_by_date(changed).items()):
+                    emitter.disseminate(date, values)
+        return count
+
+    def execute(self, date):
+        return self.execute_range(date, date)
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,214 @@
+'''
+Rolling statistics and seasonal aggregates over the pollen history.
+
+:py:class:`PollenStats` is an emitter handler keeping, for each genus, the
+daily counts sorted by date together with their running (cumulative) sums.
+Totals, counts and averages over any range of dates are therefore answered
+with two binary searches (``O(log n)``) instead of a scan of the history.
+New days are appended in ``O(1)``. Corrections and out-of-order days only
+update the running sums after the changed day.
+
+The per-year peak day of each genus is maintained as the data comes in.
+'''
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date as makedate, timedelta
+from threading import Lock
+import logging
+
+LOG = logging.getLogger(__name__)
+
+
+class _Series:
+    '''
+    Daily counts of one genus: day ordinals, values and the running sums of
+    the values (``sums[i]`` is the total of the first *i* values).
+    '''
+
+    __slots__ = ('days', 'values', 'sums', 'peaks')
+
+    def __init__(self):
+        self.days = array('i')
+        self.values = array('i')
+        self.sums = array('q', [0])
+        self.peaks = {}
+
+    def set(self, ordinal, value):
+        days = self.days
+        index = bisect_left(days, ordinal)
+        if index == len(days):
+            days.append(ordinal)
+            self.values.append(value)
+            self.sums.append(self.sums[-1] + value)
+        elif days[index] == ordinal:
+            delta = value - self.values[index]
+            if not delta:
+                return
+            self.values[index] = value
+            self._shift(index + 1, delta)
+        else:
+            days.insert(index, ordinal)
+            self.values.insert(index, value)
+            self.sums.insert(index + 1, self.sums[index] + value)
+            self._shift(index + 2, value)
+        self._update_peak(ordinal, value)
+
+    def _shift(self, start, delta):
+        sums = self.sums
+        for index in range(start, len(sums)):
+            sums[index] += delta
+
+    def _update_peak(self, ordinal, value):
+        year = makedate.fromordinal(ordinal).year
+        peak = self.peaks.get(year)
+        if peak is None or value > peak[1] or (
+                value == peak[1] and ordinal < peak[0]):
+            self.peaks[year] = ordinal, value
+        elif peak[0] == ordinal:
+            # the peak day was lowered: another day may be the peak now
+            low, high = self.span(makedate(year, 1, 1).toordinal(),
+                                  makedate(year, 12, 31).toordinal())
+            best = max(range(low, high), key=lambda i: (
+                self.values[i], -self.days[i]))
+            self.peaks[year] = self.days[best], self.values[best]
+
+    def span(self, start, end):
+        return bisect_left(self.days, start), bisect_right(self.days, end)
+
+    def total(self, start, end):
+        low, high = self.span(start, end)
+        return self.sums[high] - self.sums[low], high - low
+
+
+class PollenStats:
+    '''
+    Aggregates of the pollen counts, updated as new data is disseminated.
+
+    :param season_start: ``(month, day)`` on which a pollen season starts.
+        Season-to-date totals are counted from this day.
+
+    Genus names are the names found on the pollen.lu page (for example
+    ``"Betula"``). Days without data are left out of counts and averages.
+    The instance may be shared between threads.
+    '''
+
+    def __init__(self, season_start=(1, 1)):
+        self.season_start = season_start
+        self._series = {}
+        self._lock = Lock()
+
+    def handle(self, pollen_family, symptom_strength):
+        pass
+
+    def handle_raw_data(self, data):
+        self.load(data['values'])
+
+    def load(self, data):
+        '''
+        Add (or update) an iterable of :py:class:`pollux.model.Datum`
+        instances.
+        '''
+        with self._lock:
+            for datum in sorted(data):
+                series = self._series.get(datum.lname)
+                if series is None:
+                    series = self._series[datum.lname] = _Series()
+                series.set(datum.date.toordinal(), datum.value)
+
+    def genera(self):
+        return sorted(self._series)
+
+    def _get(self, genus):
+        series = self._series.get(genus)
+        if series is None:
+            raise KeyError('No data for genus %r' % genus)
+        return series
+
+    def total(self, genus, start, end):
+        '''
+        Return the sum of the counts of *genus* from *start* to *end* (both
+        inclusive).
+        '''
+        with self._lock:
+            return self._get(genus).total(start.toordinal(),
+                                          end.toordinal())[0]
+
+    def count(self, genus, start, end):
+        '''
+        Return the number of days with data for *genus* from *start* to
+        *end* (both inclusive).
+        '''
+        with self._lock:
+            return self._get(genus).total(start.toordinal(),
+                                          end.toordinal())[1]
+
+    def average(self, genus, start, end):
+        '''
+        Return the mean daily count of *genus* from *start* to *end* or
+        ``None`` if there is no data in that range.
+        '''
+        with self._lock:
+            total, count = self._get(genus).total(start.toordinal(),
+                                                  end.toordinal())
+        return total / count if count else None
+
+    def moving_average(self, genus, date, days=7):
+        '''
+        Return the mean count of *genus* over the *days* days ending on
+        *date* (inclusive).
+        '''
+        return self.average(genus, date - timedelta(days=days - 1), date)
+
+    def moving_averages(self, genus, start, end, days=7):
+        '''
+        Return the ``(date, average)`` pairs of the moving average of *genus*
+        for each date from *start* to *end*.
+        '''
+        output = []
+        date = start
+        while date <= end:
+            output.append((date, self.moving_average(genus, date, days)))
+            date += timedelta(days=1)
+        return output
+
+    def season_start_of(self, date):
+        '''
+        Return the first day of the season containing *date*.
+        '''
+        month, day = self.season_start
+        start = makedate(date.year, month, day)
+        if start > date:
+            start = makedate(date.year - 1, month, day)
+        return start
+
+    def season_to_date(self, genus, date):
+        '''
+        Return the total count of *genus* from the start of the season up to
+        (and including) *date*.
+        '''
+        return self.total(genus, self.season_start_of(date), date)
+
+    def year_over_year(self, genus, date):
+        '''
+        Return the season-to-date totals of *genus* on *date* and on the same
+        calendar day one year earlier, as ``(current, previous)`` tuple. The
+        29th of February is compared to the 28th.
+        '''
+        try:
+            previous = date.replace(year=date.year - 1)
+        except ValueError:
+            previous = date.replace(year=date.year - 1, day=28)
+        return (self.season_to_date(genus, date),
+                self.season_to_date(genus, previous))
+
+    def peak(self, genus, year):
+        '''
+        Return the ``(date, value)`` of the day with the highest count of
+        *genus* in *year* or ``None`` if there is no data for that year. If
+        several days share the highest count, the first one is returned.
+        '''
+        with self._lock:
+            found = self._get(genus).peaks.get(year)
+        if found is None:
+            return None
+        return makedate.fromordinal(found[0]), found[1]
@@ -0,0 +1,151 @@
+'''
+Personalised warning digests for many subscribers.
+
+Each :py:class:`Subscription` names the genera a subscriber is interested in
+and the lowest :py:class:`pollux.model.SymptomStrength` worth an alert. The
+:py:class:`SubscriberIndex` keeps an inverted index from ``(genus,
+strength)`` to the subscribers who want to hear about it. The digests of a
+day are therefore built from the day's warnings, computed once, by visiting
+only the matching subscribers instead of filtering the warnings for every
+subscriber.
+
+:py:class:`DigestDispatcher` sends the digests to the ``handle_digests``
+method of the handlers of an :py:class:`pollux.emitter.Emitter`, in batches::
+
+    index = SubscriberIndex()
+    index.add(Subscription('alice@example.com', {'betula'}, 'medium'))
+    dispatcher = DigestDispatcher(index, digest_emitter)
+    probe_emitter.add_handler(dispatcher)
+'''
+from collections import namedtuple
+from threading import Lock
+import logging
+
+from . import warnings
+from .model import SymptomStrength
+
+LOG = logging.getLogger(__name__)
+
+#: Strengths which can be subscribed to, from the lowest to the highest.
+LEVELS = (SymptomStrength.LOW, SymptomStrength.MEDIUM, SymptomStrength.HIGH)
+
+#: Number of digests passed to the handlers at once by default.
+DEFAULT_BATCH_SIZE = 1000
+
+Subscription = namedtuple('Subscription', 'subscriber, genera, strength')
+'''
+A subscriber (any hashable identifier), the lower-case names of the genera
+of interest (``None`` for all genera) and the lowest strength of
+:py:data:`LEVELS` to alert about.
+'''
+
+
+class SubscriberIndex:
+    '''
+    Inverted index from ``(genus, strength)`` to subscribers. A subscriber
+    is listed under every strength at or above the one they subscribed to.
+    Subscriptions to all genera are kept under the genus ``None``.
+
+    The index may be shared between threads.
+    '''
+
+    def __init__(self):
+        self.subscriptions = {}
+        self._index = {}
+        self._lock = Lock()
+
+    def _keys(self, subscription):
+        try:
+            lowest = LEVELS.index(subscription.strength)
+        except ValueError:
+            raise ValueError('Cannot subscribe to %r. Use one of %s' % (
+                subscription.strength, ', '.join(LEVELS)))
+        genera = subscription.genera
+        if genera is None:
+            genera = [None]
+        for genus in genera:
+            for strength in LEVELS[lowest:]:
+                yield genus, strength
+
+    def add(self, subscription):
+        '''
+        Add (or replace) the :py:class:`Subscription` of its subscriber.
+        '''
+        if subscription.genera is not None:
+            subscription = subscription._replace(genera=frozenset(
+                genus.lower() for genus in subscription.genera))
+        keys = list(self._keys(subscription))
+        with self._lock:
+            self._remove(subscription.subscriber)
+            self.subscriptions[subscription.subscriber] = subscription
+            for key in keys:
+                self._index.setdefault(key, set()).add(
+                    subscription.subscriber)
+
+    def remove(self, subscriber):
+        with self._lock:
+            self._remove(subscriber)
+
+    def _remove(self, subscriber):
+        old = self.subscriptions.pop(subscriber, None)
+        if old is None:
+            return
+        for key in self._keys(old):
+            members = self._index[key]
+            members.discard(subscriber)
+            if not members:
+                del self._index[key]
+
+    def digests(self, warnings):
+        '''
+        Return a dictionary mapping each subscriber to the part of
+        *warnings* (as returned by :py:func:`pollux.warnings`) they
+        subscribed to. Subscribers without matching warnings are left out.
+        '''
+        output = {}
+        with self._lock:
+            for genus, strength in warnings.items():
+                for key in ((genus, strength), (None, strength)):
+                    for subscriber in self._index.get(key, ()):
+                        digest = output.get(subscriber)
+                        if digest is None:
+                            digest = output[subscriber] = {}
+                        digest[genus] = strength
+        return output
+
+    def __len__(self):
+        return len(self.subscriptions)
+
+
+class DigestDispatcher:
+    '''
+    Sends the digests of a :py:class:`SubscriberIndex` to the handlers of
+    *emitter* in batches of *batch_size* ``(subscriber, warnings)`` tuples.
+
+    The dispatcher is an emitter handler itself: when the data of a date is
+    disseminated to it, the warnings of that date are computed once and
+    dispatched.
+    '''
+
+    def __init__(self, index, emitter, batch_size=DEFAULT_BATCH_SIZE):
+        self.index = index
+        self.emitter = emitter
+        self.batch_size = batch_size
+
+    def dispatch(self, date, found):
+        '''
+        Send the digests for the warnings *found* on *date*. Returns the
+        number of digests sent.
+        '''
+        digests = list(self.index.digests(found).items())
+        for offset in range(0, len(digests), self.batch_size):
+            self.emitter.send_digests(
+                date, digests[offset:offset + self.batch_size])
+        LOG.debug('Sent %d digests for %s', len(digests), date)
+        return len(digests)
+
+    def handle(self, pollen_family, symptom_strength):
+        pass
+
+    def handle_raw_data(self, data):
+        self.dispatch(data['date'], warnings(data['values'], data['date']))
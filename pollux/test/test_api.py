@@ -0,0 +1,94 @@
+from datetime import date
+from wsgiref.util import setup_testing_defaults
+import json
+import unittest
+
+from pollux.api import QueryAPI, QueryHandler
+from pollux.emitter import Emitter
+from pollux.model import Datum
+
+
+class TestQueryAPI(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = QueryHandler()
+        self.emitter = Emitter()
+        self.emitter.add_handler(self.handler)
+        self.emitter.disseminate(date(2014, 4, 10), {
+            Datum(date(2014, 4, 10), 'Betula', 40),
+            Datum(date(2014, 4, 10), 'Alnus', 5),
+        })
+        self.emitter.disseminate(date(2014, 4, 11), {
+            Datum(date(2014, 4, 11), 'Betula', 117),
+            Datum(date(2014, 4, 11), 'Alnus', 0),
+        })
+        self.app = QueryAPI(self.handler, max_age=60)
+
+    def request(self, path, query='', method='GET', **headers):
+        environ = {'PATH_INFO': path, 'QUERY_STRING': query,
+                   'REQUEST_METHOD': method}
+        environ.update(headers)
+        setup_testing_defaults(environ)
+        response = {}
+
+        def start_response(status, headers):
+            response['status'] = status
+            response['headers'] = dict(headers)
+        body = b''.join(self.app(environ, start_response))
+        return response['status'], response['headers'], body
+
+    def get_json(self, path, query=''):
+        status, _, body = self.request(path, query)
+        self.assertEqual(status, '200 OK')
+        return json.loads(body.decode('utf8'))
+
+    def test_date(self):
+        result = self.get_json('/dates/2014-04-11')
+        self.assertEqual(result, {
+            'date': '2014-04-11',
+            'values': {'Alnus': 0, 'Betula': 117},
+            'warnings': {'betula': 'high'},
+        })
+
+    def test_latest(self):
+        self.assertEqual(self.get_json('/latest')['date'], '2014-04-11')
+
+    def test_range(self):
+        result = self.get_json('/range', 'start=2014-04-01&end=2014-04-10')
+        self.assertEqual([day['date'] for day in result], ['2014-04-10'])
+        result = self.get_json('/range', 'genus=alnus')
+        self.assertEqual([day['values'] for day in result],
+                         [{'Alnus': 5}, {'Alnus': 0}])
+        self.assertEqual(result[0]['warnings'], {'alnus': 'low'})
+
+    def test_genera(self):
+        self.assertEqual(self.get_json('/genera'), ['Alnus', 'Betula'])
+        self.assertEqual(self.get_json('/genera/Betula'),
+                         {'2014-04-10': 40, '2014-04-11': 117})
+
+    def test_errors(self):
+        self.assertEqual(self.request('/dates/2014-01-01')[0],
+                         '404 Not Found')
+        self.assertEqual(self.request('/dates/yesterday')[0],
+                         '400 Bad Request')
+        self.assertEqual(self.request('/genera/Nope')[0], '404 Not Found')
+        self.assertEqual(self.request('/latest', method='POST')[0],
+                         '405 Method Not Allowed')
+
+    def test_etag(self):
+        status, headers, _ = self.request('/dates/2014-04-11')
+        self.assertEqual(headers['Cache-Control'], 'public, max-age=60')
+        status, _, body = self.request(
+            '/dates/2014-04-11', HTTP_IF_NONE_MATCH=headers['ETag'])
+        self.assertEqual(status, '304 Not Modified')
+        self.assertEqual(body, b'')
+
+    def test_update(self):
+        _, before, _ = self.request('/range')
+        self.emitter.disseminate(date(2014, 4, 11), {
+            Datum(date(2014, 4, 11), 'Alnus', 20),
+        })
+        _, after, _ = self.request('/range')
+        self.assertNotEqual(before['ETag'], after['ETag'])
+        self.assertEqual(self.get_json('/dates/2014-04-11')['values'],
+                         {'Alnus': 20, 'Betula': 117})
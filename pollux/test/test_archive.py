@@ -0,0 +1,84 @@
+from datetime import date
+from os.path import join
+from tempfile import TemporaryDirectory
+import unittest
+
+from pollux.archive import ArchiveError, ArchiveReader, ArchiveWriter
+from pollux.model import Datum
+
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+        self.path = join(self.tmpdir.name, 'pollen.bin')
+        self.data = [
+            Datum(date(2013, 12, 31), 'Betula', 1),
+            Datum(date(2014, 4, 11), 'Acer', 2),
+            Datum(date(2014, 4, 11), 'Betula', 117),
+            Datum(date(2014, 4, 12), 'Betula', 69),
+        ]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_roundtrip(self):
+        with ArchiveWriter(self.path) as writer:
+            writer.append(self.data[:1])
+        with ArchiveWriter(self.path) as writer:
+            writer.append(self.data[1:])
+        with ArchiveReader(self.path) as reader:
+            self.assertEqual(list(reader), self.data)
+            self.assertEqual(reader.year_range(2013), (0, 1))
+            self.assertEqual(reader.year_range(2014), (1, 4))
+            self.assertEqual(reader.year_range(2015), (0, 0))
+            self.assertEqual(
+                list(reader.select(date(2014, 4, 11), date(2014, 4, 11))),
+                self.data[1:3])
+            dates, genera, values = reader.columns(start=date(2014, 1, 1))
+            self.assertEqual(values.tolist(), [2, 117, 69])
+            for view in (dates, genera, values):
+                view.release()
+
+    def test_append_only(self):
+        with ArchiveWriter(self.path) as writer:
+            writer.append(self.data[1:])
+            with self.assertRaises(ArchiveError):
+                writer.append(self.data[:1])
+
+    def test_no_duplicates(self):
+        with ArchiveWriter(self.path) as writer:
+            writer.append(self.data[:3])
+            with self.assertRaises(ArchiveError):
+                writer.append(self.data[2:])
+            writer.append(self.data[3:])
+        with ArchiveReader(self.path) as reader:
+            self.assertEqual(list(reader), self.data)
+
+    def test_torn_write(self):
+        with ArchiveWriter(self.path) as writer:
+            writer.append(self.data[:3])
+        with open(self.path, 'ab') as fptr:
+            fptr.write(b'\x01\x02')
+        with ArchiveWriter(self.path) as writer:
+            self.assertEqual(writer.count, 3)
+            writer.append(self.data[3:])
+        with ArchiveReader(self.path) as reader:
+            self.assertEqual(list(reader), self.data)
+
+    def test_unknown_genus(self):
+        with ArchiveWriter(self.path) as writer:
+            with self.assertRaises(ArchiveError):
+                writer.append([Datum(date(2014, 4, 11), 'Foobar', 1)])
+
+    def test_empty(self):
+        ArchiveWriter(self.path).close()
+        with ArchiveReader(self.path) as reader:
+            self.assertEqual(len(reader), 0)
+            self.assertEqual(list(reader), [])
+
+    def test_not_an_archive(self):
+        with open(self.path, 'wb') as fptr:
+            fptr.write(b'x' * 2000)
+        with self.assertRaises(ArchiveError):
+            ArchiveReader(self.path)
@@ -0,0 +1,95 @@
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os.path import dirname, join
+from threading import Thread
+from unittest.mock import MagicMock
+import unittest
+
+import requests
+
+from pollux.asyncprobe import AsyncProbe
+from pollux.model import Datum
+
+DATA = join(dirname(__file__), 'data')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=iso-8859-1')
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestAsyncProbe(unittest.TestCase):
+
+    def setUp(self):
+        fn = join(DATA, 'data2.html')
+        with open(fn, 'rb') as fptr:
+            body = fptr.read()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.body = body
+        self.server.paths = []
+        Thread(target=self.server.serve_forever, args=(0.01,),
+               daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def make_probe(self, emitlib, **kwargs):
+        probe = AsyncProbe(requests, emitlib, **kwargs)
+        host, port = self.server.server_address
+        probe.url = lambda key: 'http://%s:%d/index.php?year=%s&week=%s' % (
+            host, port, key[0], key[1])
+        return probe
+
+    def test_execute_range(self):
+        emitlib = MagicMock()
+        probe = self.make_probe(emitlib, concurrency=4)
+        probe.execute_range(date(2014, 3, 30), date(2014, 4, 26))
+        self.assertCountEqual(self.server.paths, [
+            '/index.php?year=2014&week=13',
+            '/index.php?year=2014&week=14',
+            '/index.php?year=2014&week=15',
+            '/index.php?year=2014&week=16',
+        ])
+        calls = {args[0]: args[1]
+                 for args, _ in emitlib.disseminate.call_args_list}
+        self.assertEqual(len(calls), 28)
+        self.assertIn(Datum(date(2014, 4, 11), 'Betula', 117),
+                      calls[date(2014, 4, 11)])
+        self.assertEqual(calls[date(2014, 4, 20)], set())
+
+    def test_rate_limited_runs(self):
+        emitlib = MagicMock()
+        probe = self.make_probe(emitlib, concurrency=4, rate=100)
+        probe.execute_range(date(2014, 3, 30), date(2014, 4, 26))
+        probe.execute_range(date(2014, 3, 30), date(2014, 4, 26))
+        self.assertEqual(len(self.server.paths), 8)
+        self.assertEqual(emitlib.disseminate.call_count, 56)
+
+
+class TestRetry(unittest.TestCase):
+
+    def test_retry(self):
+        httplib = MagicMock()
+        httplib.get.side_effect = [IOError('boom'), MagicMock(text='')]
+        emitlib = MagicMock()
+        probe = AsyncProbe(httplib, emitlib, backoff=0)
+        probe.execute_range(date(2014, 4, 11), date(2014, 4, 11))
+        self.assertEqual(httplib.get.call_count, 2)
+        emitlib.disseminate.assert_called_with(date(2014, 4, 11), set())
+
+    def test_give_up(self):
+        httplib = MagicMock()
+        httplib.get.side_effect = IOError('boom')
+        probe = AsyncProbe(httplib, MagicMock(), retries=2, backoff=0)
+        with self.assertRaises(IOError):
+            probe.execute_range(date(2014, 4, 11), date(2014, 4, 11))
+        self.assertEqual(httplib.get.call_count, 3)
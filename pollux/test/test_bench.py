@@ -0,0 +1,28 @@
+from io import StringIO
+import unittest
+
+from pollux.bench import compare, run, synthetic_data
+
+
+class TestBench(unittest.TestCase):
+
+    def test_synthetic_data(self):
+        data = synthetic_data(1, genera=['Betula', 'Acer'])
+        self.assertEqual(len(data), 2 * 365)
+
+    def test_run_and_compare(self):
+        output = StringIO()
+        result = run(scale=0.001, years=1, selected=['parse/stream', 'probe'],
+                     stream=output)
+        self.assertEqual(sorted(result['results']), [
+            'parse/stream/data1', 'parse/stream/data2', 'probe/execute'])
+        stats = result['results']['probe/execute']
+        self.assertLessEqual(stats['p50'], stats['p99'])
+        self.assertGreater(stats['peak_memory'], 0)
+
+        slower = {'results': {
+            name: dict(stats, p50=stats['p50'] * 2)
+            for name, stats in result['results'].items()}, 'years': 1}
+        self.assertEqual(compare(result, slower, stream=output),
+                         sorted(result['results']))
+        self.assertEqual(compare(slower, result, stream=output), [])
@@ -0,0 +1,57 @@
+from glob import glob
+from os.path import dirname, join
+from tempfile import gettempdir
+from unittest.mock import patch
+import unittest
+
+from pollux import parse
+from pollux.bulk import parse_many
+
+DATA = join(dirname(__file__), 'data')
+
+
+class TestParseMany(unittest.TestCase):
+
+    def setUp(self):
+        self.paths = [join(DATA, 'data1.html'),
+                      join(DATA, 'data2.html')]
+        self.expected = []
+        for path in self.paths:
+            with open(path, encoding='latin1') as fptr:
+                self.expected.append(parse(fptr.read()))
+
+    def test_paths(self):
+        result = list(parse_many(self.paths * 3, workers=2, window=2))
+        self.assertEqual(result, self.expected * 3)
+
+    def test_bytes(self):
+        documents = self.read_documents()
+        result = list(parse_many(iter(documents + [b''] + documents),
+                                 workers=2))
+        self.assertEqual(result, self.expected + [set()] + self.expected)
+
+    def read_documents(self):
+        documents = []
+        for path in self.paths:
+            with open(path, 'rb') as fptr:
+                documents.append(fptr.read())
+        return documents
+
+    @patch('pollux.bulk.SPOOL_SIZE', 1)
+    def test_spool_segments(self):
+        documents = self.read_documents() * 4
+        result = list(parse_many(iter(documents), workers=2, window=2))
+        self.assertEqual(result, self.expected * 4)
+
+    def test_early_stop(self):
+        pattern = join(gettempdir(), 'pollux-spool-*')
+        before = set(glob(pattern))
+        results = parse_many(iter(self.read_documents() * 20), workers=2,
+                             window=40)
+        self.assertEqual(next(results), self.expected[0])
+        results.close()
+        self.assertEqual(set(glob(pattern)), before)
+
+    def test_single_worker(self):
+        result = list(parse_many(self.paths, workers=1))
+        self.assertEqual(result, self.expected)
@@ -0,0 +1,110 @@
+from datetime import date
+from os.path import dirname, join
+from unittest.mock import MagicMock, patch
+import unittest
+
+from pollux import Probe, parse
+from pollux.cache import ParseMemo, PollenCache
+from pollux.model import Datum
+
+DATA = join(dirname(__file__), 'data')
+
+
+class TestPollenCache(unittest.TestCase):
+
+    def setUp(self):
+        self.data = {
+            Datum(date(2014, 4, 11), 'Betula', 80),
+            Datum(date(2014, 4, 11), 'Gramineae', 3),
+            Datum(date(2014, 4, 12), 'Betula', 20),
+        }
+
+    def test_lookup(self):
+        cache = PollenCache()
+        self.assertIsNone(cache.lookup(date(2014, 4, 11)))
+        cache.put(('2014', '14'), self.data)
+        self.assertEqual(cache.lookup(date(2014, 4, 11)), {
+            Datum(date(2014, 4, 11), 'Betula', 80),
+            Datum(date(2014, 4, 11), 'Gramineae', 3),
+        })
+        self.assertEqual(cache.lookup(date(2014, 4, 6)), set())
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_probe_current_week(self):
+        httplib = MagicMock()
+        httplib.get.return_value = MagicMock(text='')
+        cache = PollenCache()
+        probe = Probe(httplib, MagicMock(), cache,
+                      today=lambda: date(2014, 4, 14))
+        probe.execute(date(2014, 4, 12))
+        probe.execute(date(2014, 4, 14))
+        probe.execute(date(2014, 4, 14))
+        self.assertEqual(httplib.get.call_count, 3)
+        self.assertIn(('2014', '14'), cache)
+        self.assertNotIn(('2014', '15'), cache)
+
+    def test_lru_entries(self):
+        cache = PollenCache(max_entries=2)
+        cache.put('a', self.data)
+        cache.put('b', self.data)
+        cache.get('a')
+        cache.put('c', self.data)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+
+    def test_lru_bytes(self):
+        cache = PollenCache()
+        cache.put('a', self.data)
+        size = cache.nbytes
+        cache.max_bytes = size * 2
+        cache.put('b', self.data)
+        cache.put('c', self.data)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.nbytes, size * 2)
+        self.assertNotIn('a', cache)
+
+    def test_probe(self):
+        httplib = MagicMock()
+        httplib.get.return_value = MagicMock(text='')
+        emitlib = MagicMock()
+        cache = PollenCache()
+        cache.put(('2014', '14'), self.data)
+        probe = Probe(httplib, emitlib, cache)
+        probe.execute(date(2014, 4, 12))
+        probe.execute(date(2014, 4, 13))
+        probe.execute(date(2014, 4, 14))
+        httplib.get.assert_called_once_with(
+            'http://www.pollen.lu/index.php?qsPage=data&year=2014&week=15')
+        emitlib.disseminate.assert_any_call(
+            date(2014, 4, 12), {Datum(date(2014, 4, 12), 'Betula', 20)})
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+
+class TestParseMemo(unittest.TestCase):
+
+    def test_probe(self):
+        fn = join(DATA, 'data2.html')
+        with open(fn, encoding='latin1') as fptr:
+            html = fptr.read()
+        httplib = MagicMock()
+        httplib.get.return_value = MagicMock(text=html)
+        emitlib = MagicMock()
+        memo = ParseMemo()
+        probe = Probe(httplib, emitlib, memo=memo)
+        with patch('pollux.parse', wraps=parse) as mocked:
+            probe.execute(date(2014, 4, 11))
+            probe.execute(date(2014, 4, 11))
+        self.assertEqual(mocked.call_count, 1)
+        self.assertEqual((memo.hits, memo.misses), (1, 1))
+        self.assertEqual(httplib.get.call_count, 2)
+        first, second = emitlib.disseminate.call_args_list
+        self.assertEqual(first, second)
+        self.assertIn(Datum(date(2014, 4, 11), 'Betula', 117), first[0][1])
+
+    def test_eviction(self):
+        memo = ParseMemo(max_entries=1)
+        memo.put(memo.key('a'), set())
+        memo.put(memo.key('b'), set())
+        self.assertIsNone(memo.get(memo.key('a')))
+        self.assertEqual(memo.get(memo.key('b')), frozenset())
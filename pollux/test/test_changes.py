@@ -0,0 +1,85 @@
+from datetime import date
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock
+import unittest
+
+from pollux.changes import ChangeFilter
+from pollux.model import Datum
+
+DAY = date(2014, 4, 11)
+
+
+class TestChangeFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+        self.path = join(self.tmpdir.name, 'state.json')
+        self.data = {
+            Datum(DAY, 'Betula', 80),
+            Datum(DAY, 'Gramineae', 3),
+        }
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_changes_only(self):
+        emitter = MagicMock()
+        changes = ChangeFilter(emitter, self.path)
+        changes.disseminate(DAY, self.data)
+        emitter.disseminate.assert_called_once_with(DAY, self.data)
+
+        emitter.reset_mock()
+        changes.disseminate(DAY, self.data)
+        self.assertFalse(emitter.disseminate.called)
+        self.assertEqual(changes.skipped, 1)
+
+        changes.disseminate(DAY, {Datum(DAY, 'Betula', 90),
+                                  Datum(DAY, 'Gramineae', 3)})
+        emitter.disseminate.assert_called_once_with(
+            DAY, {Datum(DAY, 'Betula', 90)})
+
+    def test_persistent(self):
+        ChangeFilter(MagicMock(), self.path).disseminate(DAY, self.data)
+        emitter = MagicMock()
+        changes = ChangeFilter(emitter, self.path)
+        changes.disseminate(DAY, self.data)
+        self.assertFalse(emitter.disseminate.called)
+
+    def test_full(self):
+        emitter = MagicMock()
+        changes = ChangeFilter(emitter, full=True)
+        changes.disseminate(DAY, self.data)
+        changes.disseminate(DAY, {Datum(DAY, 'Betula', 90),
+                                  Datum(DAY, 'Gramineae', 3)})
+        emitter.disseminate.assert_called_with(
+            DAY, {Datum(DAY, 'Betula', 90), Datum(DAY, 'Gramineae', 3)})
+
+    def test_keep(self):
+        changes = ChangeFilter(MagicMock(), keep=2)
+        for day in range(1, 5):
+            changes.disseminate(date(2014, 4, day),
+                                {Datum(date(2014, 4, day), 'Betula', 1)})
+        self.assertEqual(sorted(changes.snapshots),
+                         [date(2014, 4, 3), date(2014, 4, 4)])
+
+    def test_keep_zero(self):
+        with self.assertRaises(ValueError):
+            ChangeFilter(MagicMock(), keep=0)
+
+    def test_failed_emission(self):
+        emitter = MagicMock()
+        emitter.disseminate.side_effect = IOError('boom')
+        with self.assertRaises(IOError):
+            ChangeFilter(emitter, self.path).disseminate(DAY, self.data)
+
+        emitter = MagicMock()
+        changes = ChangeFilter(emitter, self.path)
+        changes.disseminate(DAY, self.data)
+        emitter.disseminate.assert_called_once_with(DAY, self.data)
+        self.assertEqual(changes.skipped, 0)
+
+    def test_forwarding(self):
+        emitter = MagicMock()
+        ChangeFilter(emitter).warn('betula', 'high')
+        emitter.warn.assert_called_once_with('betula', 'high')
@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from tempfile import NamedTemporaryFile
+import json
+import os
+import time
+import unittest
+
+from pollux import warnings
+from pollux.classifier import Classifier, Scheme, install
+from pollux.data import GENERA, THRESHOLDS
+from pollux.frame import GENUS_CODES, GENUS_NAMES, genus_code
+from pollux.model import Datum, SymptomStrength
+
+
+class TestClassifier(unittest.TestCase):
+
+    def tearDown(self):
+        install(None)
+
+    def write(self, document):
+        with NamedTemporaryFile('w', suffix='.json', delete=False) as fptr:
+            json.dump(document, fptr)
+        self.addCleanup(os.unlink, fptr.name)
+        return fptr.name
+
+    def test_von_wahl(self):
+        classifier = Classifier()
+        for genus, threshold in THRESHOLDS.items():
+            expected = [
+                (-1, SymptomStrength.ERROR),
+                (0, None),
+                (1, SymptomStrength.LOW),
+                (threshold.light - 1, SymptomStrength.LOW),
+                (threshold.light, SymptomStrength.MEDIUM),
+                (threshold.medium - 1, SymptomStrength.MEDIUM),
+                (threshold.medium, SymptomStrength.HIGH),
+                (threshold.medium * 10, SymptomStrength.HIGH),
+            ]
+            for value, strength in expected:
+                self.assertEqual(
+                    classifier.classify(genus.capitalize(), value),
+                    strength, (genus, value))
+        for genus in sorted(set(GENERA) - set(THRESHOLDS)):
+            self.assertEqual(classifier.classify(genus.capitalize(), 10),
+                             SymptomStrength.UNKNOWN, genus)
+
+    def test_columns(self):
+        classifier = Classifier()
+        codes = [GENUS_CODES['betula'], GENUS_CODES['acer'],
+                 GENUS_CODES['betula']]
+        self.assertEqual(classifier.classify_columns(codes, [60, 60, 0]),
+                         [SymptomStrength.HIGH, SymptomStrength.UNKNOWN,
+                          None])
+
+    def test_new_genus(self):
+        classifier = Classifier()
+        self.assertEqual(classifier.classify('Newgenus', 10),
+                         SymptomStrength.UNKNOWN)
+
+    def test_threads(self):
+        class SlowScheme(Scheme):
+            def entry(self, genus):
+                if genus.startswith('Race'):
+                    time.sleep(0.01)  # let the other threads catch up
+                return super().entry(genus)
+
+        classifier = Classifier(SlowScheme.von_wahl())
+        for number in range(3):
+            genus_code('Racegenus%d' % number)
+        with ThreadPoolExecutor(4) as executor:
+            for _ in range(4):
+                executor.submit(classifier.tables)
+        keys, limits, labels = classifier.tables()
+        self.assertEqual(keys, [name.lower() for name in GENUS_NAMES])
+        self.assertEqual(len(limits), len(keys))
+        self.assertEqual(len(labels), len(keys))
+
+    def test_custom_scheme(self):
+        path = self.write({
+            'name': 'five',
+            'labels': ['error', None, 'low', 'medium', 'high', 'extreme'],
+            'limits': {'Betula': [0, 1, 10, 50, 200]},
+            'default': [0, 1, 5, 20, 100],
+        })
+        classifier = Classifier(Scheme.from_file(path))
+        self.assertEqual(classifier.classify('Betula', 250), 'extreme')
+        self.assertEqual(classifier.classify('Betula', 100), 'high')
+        self.assertEqual(classifier.classify('Acer', 100), 'extreme')
+        self.assertEqual(classifier.classify('Acer', 0), None)
+
+    def test_threshold_overrides(self):
+        path = self.write({'betula': [100, 200], 'Ambrosia': [1, 5]})
+        install(Classifier(Scheme.from_file(path)))
+        day = date(2014, 4, 11)
+        result = warnings({Datum(day, 'Betula', 117),
+                           Datum(day, 'Ambrosia', 3),
+                           Datum(day, 'Alnus', 60)}, day)
+        self.assertEqual(result, {'betula': SymptomStrength.MEDIUM,
+                                  'ambrosia': SymptomStrength.MEDIUM,
+                                  'alnus': SymptomStrength.HIGH})
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Scheme('bad', ['a', 'b'], {'betula': [1, 2]})
+        with self.assertRaises(ValueError):
+            Scheme('bad', ['a', 'b', 'c'], {'betula': [2, 1]})
@@ -0,0 +1,107 @@
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread, Timer
+from unittest.mock import MagicMock
+import os
+import signal
+import unittest
+
+from pollux.cache import PollenCache
+from pollux.daemon import Scheduler, make_session
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.clients.append(self.client_address)
+        body = b'ok'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSession(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        self.server.clients = []
+        Thread(target=self.server.serve_forever, args=(0.01,),
+               daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_reused(self):
+        url = 'http://%s:%d/' % self.server.server_address
+        with make_session(pool_size=2, timeout=5) as session:
+            for _ in range(3):
+                self.assertEqual(session.get(url).text, 'ok')
+        self.assertEqual(len(self.server.clients), 3)
+        self.assertEqual(len(set(self.server.clients)), 1)
+
+    def test_default_timeout(self):
+        session = make_session(timeout=5)
+        session.send = MagicMock()
+        session.get('http://localhost/')
+        self.assertEqual(session.send.call_args[1]['timeout'], 5)
+
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.probe = MagicMock()
+        self.probe.cache = None
+
+    def test_runs(self):
+        scheduler = Scheduler(self.probe, interval=0,
+                              today=lambda: date(2014, 4, 11))
+        scheduler.run(runs=3)
+        self.assertEqual(self.probe.execute.call_count, 3)
+        self.probe.execute.assert_called_with(date(2014, 4, 11))
+
+    def test_days(self):
+        scheduler = Scheduler(self.probe, days=3,
+                              today=lambda: date(2014, 4, 11))
+        scheduler.run_once()
+        self.probe.execute_range.assert_called_once_with(
+            date(2014, 4, 9), date(2014, 4, 11))
+
+    def test_failure_does_not_stop(self):
+        self.probe.execute.side_effect = [IOError('down'), None]
+        scheduler = Scheduler(self.probe, interval=0)
+        scheduler.run(runs=2)
+        self.assertEqual(scheduler.runs, 2)
+        self.assertEqual(scheduler.failures, 1)
+
+    def test_jitter(self):
+        scheduler = Scheduler(self.probe, interval=100, jitter=0.2)
+        delays = [scheduler.delay() for _ in range(200)]
+        self.assertTrue(all(80 <= delay <= 120 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    def test_polled_weeks_refreshed(self):
+        self.probe.cache = PollenCache()
+        self.probe.cache.put(('2014', '14'), set())
+        self.probe.cache.put(('2014', '13'), set())
+        scheduler = Scheduler(self.probe, today=lambda: date(2014, 4, 11))
+        scheduler.run_once()
+        self.assertNotIn(('2014', '14'), self.probe.cache)
+        self.assertIn(('2014', '13'), self.probe.cache)
+
+    def test_stop_on_signal(self):
+        scheduler = Scheduler(self.probe, interval=60)
+        previous = signal.getsignal(signal.SIGTERM)
+        try:
+            scheduler.install_signal_handlers()
+            Timer(0.05, os.kill, (os.getpid(), signal.SIGTERM)).start()
+            scheduler.run()
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+        self.assertTrue(scheduler.stopped)
+        self.assertEqual(self.probe.execute.call_count, 1)
@@ -1,7 +1,10 @@
 import unittest
 from datetime import date
+from os.path import join
+from tempfile import TemporaryDirectory
+from threading import Event
 
-from pollux.emitter import Emitter, MemoryHandler
+from pollux.emitter import Emitter, MemoryHandler, Overflow, SQLiteHandler
 from pollux.model import Datum
 
 
@@ -42,3 +45,168 @@ class TestEmitter(unittest.TestCase):
         }
         self.assertEqual(result, expected)
 
+
+class ListHandler:
+
+    def __init__(self, gate=None, expected=None):
+        self.gate = gate
+        self.expected = expected
+        self.done = Event()  # set once *expected* calls were handled
+        self.calls = []
+
+    def handle(self, pollen_family, symptom_strength):
+        if self.gate:
+            self.gate.wait(5)
+        self.calls.append(pollen_family)
+        if len(self.calls) == self.expected:
+            self.done.set()
+
+    def handle_raw_data(self, data):
+        self.calls.append(data['date'])
+
+
+class TestThreadedEmitter(unittest.TestCase):
+
+    def test_ordering(self):
+        handlers = [ListHandler() for _ in range(5)]
+        with Emitter(workers=2, queue_size=3) as emitter:
+            for handler in handlers:
+                emitter.add_handler(handler)
+            for i in range(100):
+                emitter.warn(i, 'low')
+            emitter.disseminate(date(2014, 4, 11), set())
+        for handler in handlers:
+            self.assertEqual(handler.calls,
+                             list(range(100)) + [date(2014, 4, 11)])
+
+    def test_slow_handler(self):
+        gate = Event()
+        slow, fast = ListHandler(gate), ListHandler(expected=2)
+        emitter = Emitter(workers=2)
+        emitter.add_handler(slow)
+        emitter.add_handler(fast)
+        emitter.warn('a', 'low')
+        emitter.warn('b', 'low')
+        self.assertTrue(fast.done.wait(5))
+        self.assertEqual(fast.calls, ['a', 'b'])
+        self.assertEqual(slow.calls, [])
+        gate.set()
+        emitter.close()
+        self.assertEqual(slow.calls, ['a', 'b'])
+
+    def test_drop_new(self):
+        gate = Event()
+        handler = ListHandler(gate)
+        emitter = Emitter(workers=1, queue_size=1, overflow=Overflow.DROP_NEW)
+        emitter.add_handler(handler)
+        emitter.warn('a', 'low')  # may already be running
+        emitter.warn('b', 'low')
+        emitter.warn('c', 'low')
+        emitter.warn('d', 'low')
+        gate.set()
+        emitter.close()
+        self.assertEqual(handler.calls[0], 'a')
+        self.assertGreaterEqual(emitter.dropped, 2)
+        self.assertEqual(len(handler.calls) + emitter.dropped, 4)
+
+    def test_drop_old(self):
+        gate = Event()
+        handler = ListHandler(gate)
+        emitter = Emitter(workers=1, queue_size=1, overflow=Overflow.DROP_OLD)
+        emitter.add_handler(handler)
+        for name in 'abcd':
+            emitter.warn(name, 'low')
+        gate.set()
+        emitter.close()
+        self.assertEqual(handler.calls[-1], 'd')
+        self.assertEqual(len(handler.calls) + emitter.dropped, 4)
+
+    def test_failing_handler(self):
+        class FailingHandler:
+            def handle(self, pollen_family, symptom_strength):
+                raise ValueError(pollen_family)
+
+        handler = ListHandler()
+        emitter = Emitter(workers=2)
+        emitter.add_handler(FailingHandler())
+        emitter.add_handler(handler)
+        with self.assertLogs('pollux.emitter', 'ERROR'):
+            emitter.warn('a', 'low')
+            emitter.close()
+        self.assertEqual(handler.calls, ['a'])
+
+
+class TestWarnBatch(unittest.TestCase):
+
+    def test_batch_hook(self):
+        class BatchHandler:
+            def __init__(self):
+                self.batches = []
+
+            def handle_batch(self, date, warnings):
+                self.batches.append((date, warnings))
+
+        batch_handler = BatchHandler()
+        memory_handler = MemoryHandler()
+        emitter = Emitter()
+        emitter.add_handler(batch_handler)
+        emitter.add_handler(memory_handler)
+        warnings = {'betula': 'high', 'quercus': 'low'}
+        emitter.warn_batch(date(2014, 4, 11), warnings)
+        self.assertEqual(batch_handler.batches,
+                         [(date(2014, 4, 11), warnings)])
+        self.assertEqual(memory_handler.emitted_values,
+                         {('betula', 'high'), ('quercus', 'low')})
+
+    def test_batch_threaded(self):
+        handler = ListHandler()
+        with Emitter(workers=2) as emitter:
+            emitter.add_handler(handler)
+            emitter.warn_batch(date(2014, 4, 11), {'a': 'low', 'b': 'low'})
+            emitter.warn('c', 'low')
+        self.assertEqual(handler.calls, ['a', 'b', 'c'])
+
+
+class TestSQLiteHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+        self.handler = SQLiteHandler(join(self.tmpdir.name, 'pollen.db'))
+        self.emitter = Emitter()
+        self.emitter.add_handler(self.handler)
+
+    def tearDown(self):
+        self.handler.close()
+        self.tmpdir.cleanup()
+
+    def test_upsert(self):
+        self.emitter.disseminate(date(2014, 4, 11), {
+            Datum(date(2014, 4, 11), 'Acer', 2),
+            Datum(date(2014, 4, 11), 'Betula', 117),
+        })
+        self.emitter.disseminate(date(2014, 4, 12), {
+            Datum(date(2014, 4, 12), 'Betula', 69),
+        })
+        self.emitter.disseminate(date(2014, 4, 11), {
+            Datum(date(2014, 4, 11), 'Betula', 118),
+        })
+        result = self.handler.range(date(2014, 4, 11), date(2014, 4, 12))
+        expected = [
+            Datum(date(2014, 4, 11), 'Acer', 2),
+            Datum(date(2014, 4, 11), 'Betula', 118),
+            Datum(date(2014, 4, 12), 'Betula', 69),
+        ]
+        self.assertEqual(result, expected)
+        result = self.handler.range(date(2014, 4, 11), date(2014, 4, 11),
+                                    genera=['Acer'])
+        self.assertEqual(result, expected[:1])
+        self.assertEqual(self.handler.series('Betula'), [
+            (date(2014, 4, 11), 118),
+            (date(2014, 4, 12), 69),
+        ])
+
+    def test_warnings(self):
+        self.emitter.warn('betula', 'high')
+        self.emitter.warn_batch(date(2014, 4, 11), {'betula': 'high'})
+        self.assertEqual(self.handler.warnings(date(2014, 4, 11)),
+                         {'betula': 'high'})
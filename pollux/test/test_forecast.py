@@ -0,0 +1,105 @@
+from datetime import date, timedelta
+from tempfile import TemporaryDirectory
+from os.path import join
+from unittest.mock import MagicMock
+import unittest
+
+from pollux.forecast import Forecaster, day_of_year
+from pollux.model import Datum, SymptomStrength
+
+
+def seasonal(day):
+    return max(0, 100 - abs(day_of_year(day) - 100) * 2)
+
+
+class TestForecaster(unittest.TestCase):
+
+    def setUp(self):
+        self.history = set()
+        day = date(2010, 1, 1)
+        while day <= date(2013, 12, 31):
+            self.history.add(Datum(day, 'Betula', seasonal(day)))
+            day += timedelta(days=1)
+        self.forecaster = Forecaster(window=0)
+        self.forecaster.update(self.history)
+
+    def test_day_of_year(self):
+        self.assertEqual(day_of_year(date(2013, 3, 1)),
+                         day_of_year(date(2012, 3, 1)))
+        self.assertEqual(day_of_year(date(2012, 12, 31)), 365)
+
+    def test_climatology(self):
+        predicted = self.forecaster.predict(date(2014, 1, 1), 3)['Betula']
+        expected = [seasonal(date(2014, 1, 1) + timedelta(days=n))
+                    for n in range(3)]
+        for value, wanted in zip(predicted, expected):
+            self.assertAlmostEqual(value, wanted, delta=1)
+
+    def test_anomaly_decays(self):
+        last = date(2014, 4, 10)
+        day = date(2014, 1, 1)
+        while day <= last:
+            bonus = 100 if day > last - timedelta(days=5) else 0
+            self.forecaster.update([Datum(day, 'Betula',
+                                          seasonal(day) + bonus)])
+            day += timedelta(days=1)
+        predicted = self.forecaster.predict(last + timedelta(days=1), 10)
+        anomalies = [value - seasonal(last + timedelta(days=n + 1))
+                     for n, value in enumerate(predicted['Betula'])]
+        self.assertGreater(anomalies[0], 30)
+        self.assertTrue(all(a > b for a, b in zip(anomalies, anomalies[1:])))
+        self.assertLess(anomalies[-1], 5)
+
+    def test_corrections(self):
+        model = self.forecaster.models['Betula']
+        slot = day_of_year(date(2013, 12, 25))
+        count, total = model.counts[slot], model.sums[slot]
+        self.forecaster.update([Datum(date(2013, 12, 25), 'Betula', 500)])
+        self.assertEqual(model.counts[slot], count)
+        self.assertEqual(model.sums[slot],
+                         total + 500 - seasonal(date(2013, 12, 25)))
+
+    def test_old_values_dropped(self):
+        model = self.forecaster.models['Betula']
+        self.assertEqual(len(model.values), 14)
+        self.assertEqual(self.forecaster.since(), date(2013, 12, 18))
+        slot = day_of_year(date(2013, 6, 1))
+        count, total = model.counts[slot], model.sums[slot]
+        self.forecaster.update([Datum(date(2013, 6, 1), 'Betula', 500)])
+        self.assertEqual((model.counts[slot], model.sums[slot]),
+                         (count, total))
+
+    def test_no_damping_before_last(self):
+        day = date(2014, 1, 1)
+        self.forecaster.update([Datum(day, 'Betula', 50)])
+        model = self.forecaster.models['Betula']
+        for start in (date(2013, 12, 20), day):
+            predicted = self.forecaster.predict(start, 1)['Betula'][0]
+            climatology = model.climatology(day_of_year(start))
+            self.assertAlmostEqual(predicted - climatology, 15)
+
+    def test_warnings(self):
+        found = self.forecaster.forecast_warnings(date(2014, 4, 9), 2)
+        self.assertEqual(found, {date(2014, 4, 9):
+                                 {'betula': SymptomStrength.HIGH},
+                                 date(2014, 4, 10):
+                                 {'betula': SymptomStrength.HIGH}})
+        emitter = MagicMock()
+        self.forecaster.publish(emitter, date(2014, 4, 9), 2)
+        emitter.warn_batch.assert_called_with(
+            date(2014, 4, 10), {'betula': SymptomStrength.HIGH})
+
+    def test_save(self):
+        with TemporaryDirectory() as folder:
+            path = join(folder, 'models.json')
+            self.forecaster.save(path)
+            restored = Forecaster.load(path)
+        self.assertEqual(restored.predict(date(2014, 2, 1), 5),
+                         self.forecaster.predict(date(2014, 2, 1), 5))
+
+    def test_handler(self):
+        forecaster = Forecaster()
+        day = date(2014, 4, 11)
+        forecaster.handle_raw_data({'date': day,
+                                    'values': {Datum(day, 'Alnus', 40)}})
+        self.assertEqual(forecaster.predict(day, 1), {'Alnus': [40.0]})
@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import unittest
+
+from pollux.frame import GENUS_NAMES, PollenFrame, genus_code
+from pollux.model import Datum
+
+
+class TestPollenFrame(unittest.TestCase):
+
+    def setUp(self):
+        self.data = {
+            Datum(date(2014, 4, 12), 'Gramineae', 100),
+            Datum(date(2014, 4, 11), 'Betula', 80),
+            Datum(date(2014, 4, 11), 'Gramineae', 3),
+            Datum(date(2014, 4, 13), 'Betula', -1),
+            Datum(date(2014, 4, 13), 'Foobar', 10),
+        }
+
+    def test_roundtrip(self):
+        frame = PollenFrame.from_data(self.data)
+        self.assertEqual(len(frame), 5)
+        self.assertEqual(frame.to_data(), self.data)
+        self.assertEqual(frame.nbytes, 5 * (4 + 2 + 4))
+
+    def test_genus_code(self):
+        self.assertEqual(GENUS_NAMES[genus_code('Betula')], 'Betula')
+        code = genus_code('Foobar')
+        self.assertEqual(genus_code('Foobar'), code)
+        self.assertEqual(GENUS_NAMES[code], 'Foobar')
+        self.assertEqual(genus_code('betula'), genus_code('Betula'))
+        self.assertEqual(genus_code('FOOBAR'), code)
+
+    def test_lower_case_names(self):
+        count = len(GENUS_NAMES)
+        frame = PollenFrame.from_data({Datum(date(2014, 4, 11), 'betula', 80)})
+        self.assertEqual(len(GENUS_NAMES), count)
+        self.assertEqual(frame.to_data(),
+                         {Datum(date(2014, 4, 11), 'Betula', 80)})
+
+    def test_genus_code_threads(self):
+        names = ['Threaded%d' % number for number in range(200)]
+        with ThreadPoolExecutor(8) as executor:
+            codes = list(executor.map(genus_code, names))
+        self.assertEqual(len(set(codes)), len(names))
+        self.assertEqual([GENUS_NAMES[code] for code in codes], names)
+
+    def test_select(self):
+        frame = PollenFrame.from_data(self.data)
+        self.assertEqual(frame.on(date(2014, 4, 11)).to_data(), {
+            Datum(date(2014, 4, 11), 'Betula', 80),
+            Datum(date(2014, 4, 11), 'Gramineae', 3),
+        })
+        result = frame.select(start=date(2014, 4, 12), genera=['Betula'])
+        self.assertEqual(result.to_data(), {
+            Datum(date(2014, 4, 13), 'Betula', -1),
+        })
+        result = frame.select(end=date(2014, 4, 12),
+                              genera=['betula', 'GRAMINEAE'])
+        self.assertEqual(result, frame.select(end=date(2014, 4, 12)))
+
+    def test_unsorted_extend(self):
+        frame = PollenFrame.from_data(
+            {datum for datum in self.data if datum.date.day > 11})
+        frame.append(Datum(date(2014, 4, 11), 'Betula', 80))
+        self.assertFalse(frame.is_sorted)
+        self.assertEqual(frame.on(date(2014, 4, 11)).to_data(), {
+            Datum(date(2014, 4, 11), 'Betula', 80),
+        })
+        self.assertTrue(frame.is_sorted)
+        self.assertEqual(list(frame.dates), sorted(frame.dates))
@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from os import listdir
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock
+import unittest
+
+from pollux.httpcache import CacheMiss, HttpCache, page_key
+
+URL = 'http://www.pollen.lu/index.php?qsPage=data&year=2014&week=14'
+
+
+def make_response(content, status_code=200, headers=None):
+    return MagicMock(content=content, encoding='latin1',
+                     status_code=status_code, headers=headers or {})
+
+
+class TestHttpCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+        self.httplib = MagicMock()
+        self.httplib.get.return_value = make_response(
+            b'\xe9t\xe9', headers={'ETag': '"abc"'})
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def make_cache(self, today, **kwargs):
+        return HttpCache(self.httplib, self.tmpdir.name,
+                         today=lambda: today, **kwargs)
+
+    def test_finished_week(self):
+        cache = self.make_cache(date(2015, 1, 1))
+        cache.get(URL)
+        result = cache.get(URL)
+        self.assertEqual(self.httplib.get.call_count, 1)
+        self.assertEqual(result.text, 'été')
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_current_week_is_revalidated(self):
+        cache = self.make_cache(date(2014, 4, 10))
+        cache.get(URL)
+        self.httplib.get.return_value = make_response(b'', status_code=304)
+        result = cache.get(URL)
+        self.httplib.get.assert_called_with(
+            URL, headers={'If-None-Match': '"abc"'})
+        self.assertEqual(result.text, 'été')
+
+    def test_current_week_changed(self):
+        cache = self.make_cache(date(2014, 4, 10))
+        cache.get(URL)
+        self.httplib.get.return_value = make_response(b'new')
+        cache.get(URL)
+        self.httplib.get.return_value = make_response(b'', status_code=304)
+        self.assertEqual(cache.get(URL).text, 'new')
+
+    def test_offline(self):
+        self.make_cache(date(2014, 4, 10)).get(URL)
+        self.httplib.reset_mock()
+        cache = self.make_cache(date(2014, 4, 10), offline=True)
+        self.assertEqual(cache.get(URL).text, 'été')
+        with self.assertRaises(CacheMiss):
+            cache.get(URL.replace('week=14', 'week=15'))
+        self.assertFalse(self.httplib.get.called)
+
+    def test_eviction(self):
+        cache = self.make_cache(date(2015, 1, 1), max_size=4)
+        cache.get(URL)
+        cache.get(URL.replace('week=14', 'week=15'))
+        self.assertIsNone(cache.load(page_key(URL)))
+        self.assertIsNotNone(
+            cache.load(page_key(URL.replace('week=14', 'week=15'))))
+
+    def test_hosts(self):
+        other = URL.replace('www.pollen.lu', 'other.example')
+        self.assertNotEqual(page_key(URL), page_key(other))
+        cache = self.make_cache(date(2015, 1, 1))
+        cache.get(URL)
+        self.httplib.get.return_value = make_response(b'other')
+        self.assertEqual(cache.get(other).content, b'other')
+        self.assertEqual(cache.get(URL).content, b'\xe9t\xe9')
+        self.assertEqual(cache.get(other).content, b'other')
+        self.assertEqual(self.httplib.get.call_count, 2)
+
+    def test_concurrent_writers(self):
+        cache = self.make_cache(date(2015, 1, 1), max_size=4)
+        urls = [URL.replace('week=14', 'week=%d' % (week % 3 + 10))
+                for week in range(60)]
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(cache.get, urls))
+        self.assertEqual([result.content for result in results],
+                         [b'\xe9t\xe9'] * len(urls))
+        self.assertFalse([name for name in listdir(self.tmpdir.name)
+                          if name.endswith('.tmp')])
@@ -0,0 +1,47 @@
+from os.path import dirname, join
+from subprocess import check_output
+import json
+import sys
+import unittest
+
+import pollux
+
+DATA = join(dirname(__file__), 'data')
+
+#: Modules which are expensive to import or optional backends, and must only
+#: be loaded when the feature needing them is used.
+HEAVY = ['asyncio', 'bs4', 'concurrent.futures', 'pkg_resources',
+         'pollux.httpcache', 'requests', 'sqlite3']
+
+
+def loaded_modules(statement):
+    '''
+    Run *statement* in a fresh interpreter and return the names of the
+    :py:data:`HEAVY` modules it imported.
+    '''
+    code = '%s\nimport json, sys\nprint(json.dumps([name for name in %r ' \
+        'if name in sys.modules]))' % (statement, HEAVY)
+    return json.loads(check_output([sys.executable, '-c', code]))
+
+
+class TestImports(unittest.TestCase):
+
+    def test_import_package(self):
+        self.assertEqual(loaded_modules('import pollux'), [])
+
+    def test_import_cli(self):
+        self.assertEqual(loaded_modules('import pollux.cli'), [])
+
+    def test_import_emitter(self):
+        self.assertEqual(loaded_modules('import pollux.emitter'), [])
+
+    def test_stream_parse(self):
+        statement = ('import pollux\n'
+                     'pollux.parse(open(%r, encoding="latin1").read())' %
+                     join(DATA, 'data2.html'))
+        self.assertEqual(loaded_modules(statement), [])
+
+    def test_version(self):
+        path = join(dirname(pollux.__file__), 'version.txt')
+        with open(path) as fptr:
+            self.assertEqual(pollux.__version__, fptr.read().strip())
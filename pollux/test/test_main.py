@@ -1,11 +1,14 @@
 from datetime import date
-from pkg_resources import resource_filename
+from os.path import dirname, join
 from unittest.mock import MagicMock, call
 import unittest
 
-from pollux import warnings
+from pollux import warnings, warnings_range, week_end
+from pollux.frame import PollenFrame
 from pollux.model import Datum, SymptomStrength
 
+DATA = join(dirname(__file__), 'data')
+
 
 class TestWarnings(unittest.TestCase):
 
@@ -59,13 +62,31 @@ class TestWarnings(unittest.TestCase):
         expected = {}
         self.assertEqual(result, expected)
 
+    def test_warnings_unknown(self):
+        data = {Datum(date(2014, 4, 11), 'Acer', 0)}
+        result = warnings(data, date(2014, 4, 11))
+        expected = {'acer': SymptomStrength.UNKNOWN}
+        self.assertEqual(result, expected)
+
+    def test_warnings_range(self):
+        dates = [date(2014, 4, 11), date(2014, 4, 14), date(2014, 4, 15),
+                 date(1100, 4, 11)]
+        expected = {day: warnings(self.data, day) for day in dates}
+        self.assertEqual(warnings_range(self.data, dates), expected)
+        frame = PollenFrame.from_data(self.data)
+        self.assertEqual(warnings_range(frame, dates), expected)
+
 
 class TestMain(unittest.TestCase):
 
+    def test_week_end(self):
+        self.assertEqual(week_end(('2014', '14')), date(2014, 4, 12))
+        self.assertEqual(week_end(('2014', '52')), date(2014, 12, 31))
+
     def test_execute(self):
         from pollux import Probe
 
-        fn = resource_filename('pollux', 'test/data/data2.html')
+        fn = join(DATA, 'data2.html')
         with open(fn, encoding='latin1') as fptr:
             html = fptr.read()
 
@@ -131,3 +152,29 @@ class TestMain(unittest.TestCase):
         probe.execute(date(2015, 7, 5))
         httplib.get.assert_called_with(
             'http://www.pollen.lu/index.php?qsPage=data&year=2015&week=27')
+
+    def test_execute_range(self):
+        '''
+        Dates in the same week should only cause one request.
+        '''
+        from pollux import Probe
+
+        fn = join(DATA, 'data2.html')
+        with open(fn, encoding='latin1') as fptr:
+            html = fptr.read()
+
+        httplib = MagicMock()
+        httplib.get.return_value = MagicMock(text=html)
+        emitlib = MagicMock()
+        probe = Probe(httplib, emitlib)
+        probe.execute_range(date(2014, 4, 11), date(2014, 4, 14))
+        url = 'http://www.pollen.lu/index.php?qsPage=data&year=2014&week=%d'
+        self.assertEqual(httplib.get.call_args_list,
+                         [call(url % 14), call(url % 15)])
+        self.assertEqual(
+            [args[0] for args, _ in emitlib.disseminate.call_args_list],
+            [date(2014, 4, 11), date(2014, 4, 12),
+             date(2014, 4, 13), date(2014, 4, 14)])
+        values = emitlib.disseminate.call_args_list[0][0][1]
+        self.assertEqual(len(values), 33)
+        self.assertIn(Datum(date(2014, 4, 11), 'Betula', 117), values)
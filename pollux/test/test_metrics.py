@@ -0,0 +1,65 @@
+from datetime import date
+from os.path import dirname, join
+from unittest.mock import MagicMock
+import json
+import unittest
+
+from pollux import Probe
+from pollux.emitter import Emitter, MemoryHandler
+from pollux.metrics import Metrics, NullMetrics, active, install
+
+DATA = join(dirname(__file__), 'data')
+
+
+class TestMetrics(unittest.TestCase):
+
+    def tearDown(self):
+        install(None)
+
+    def test_default(self):
+        self.assertIsInstance(active(), NullMetrics)
+        with active().timer('foo'):
+            pass
+        active().increment('bar')
+
+    def test_exporters(self):
+        metrics = Metrics()
+        metrics.observe('pollux_x_seconds', 0.5, stage='a"b')
+        metrics.observe('pollux_x_seconds', 1.5, stage='a"b')
+        metrics.increment('pollux_y_total', 3)
+        self.assertEqual(metrics.to_prometheus(), (
+            '# TYPE pollux_y_total counter\n'
+            'pollux_y_total 3\n'
+            '# TYPE pollux_x_seconds summary\n'
+            'pollux_x_seconds_count{stage="a\\"b"} 2\n'
+            'pollux_x_seconds_sum{stage="a\\"b"} 2.0\n'))
+        self.assertEqual(json.loads(metrics.to_json()), {
+            'counters': [
+                {'name': 'pollux_y_total', 'labels': {}, 'value': 3}],
+            'timers': [
+                {'name': 'pollux_x_seconds', 'labels': {'stage': 'a"b'},
+                 'count': 2, 'sum': 2.0, 'max': 1.5}],
+        })
+
+    def test_probe(self):
+        fn = join(DATA, 'data2.html')
+        with open(fn, encoding='latin1') as fptr:
+            html = fptr.read()
+        httplib = MagicMock()
+        httplib.get.return_value = MagicMock(text=html)
+        emitter = Emitter()
+        emitter.add_handler(MemoryHandler())
+        metrics = install(Metrics())
+        Probe(httplib, emitter).execute(date(2014, 4, 11))
+        timers = {name: count for (name, _), (count, _, _)
+                  in metrics.timers.items()}
+        self.assertEqual(timers, {
+            'pollux_probe_execute_seconds': 1,
+            'pollux_probe_http_seconds': 1,
+            'pollux_parse_seconds': 1,
+            'pollux_probe_emit_seconds': 1,
+            'pollux_handler_seconds': 1,
+        })
+        self.assertIn(
+            ('pollux_handler_seconds', (('handler', 'MemoryHandler'),)),
+            metrics.timers)
@@ -0,0 +1,102 @@
+from datetime import date
+from os.path import dirname, join
+from unittest.mock import MagicMock
+import tracemalloc
+import unittest
+
+from pollux import Probe, parse, warnings
+from pollux.bench import NullHandler, StubHttp
+from pollux.emitter import Emitter
+from pollux.pipeline import (classified, emit, fetch, rows, stream_range,
+                             week_keys)
+
+DATA = join(dirname(__file__), 'data')
+
+
+class CollectingHandler:
+
+    def __init__(self):
+        self.values = set()
+        self.warnings = {}
+
+    def handle(self, pollen_family, symptom_strength):
+        pass
+
+    def handle_batch(self, date, warnings):
+        self.warnings.setdefault(date, {}).update(warnings)
+
+    def handle_raw_data(self, data):
+        self.values.update(data['values'])
+
+
+class Stop(Exception):
+    pass
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        with open(join(DATA, 'data2.html'), encoding='latin1') as fptr:
+            self.page = fptr.read()
+
+    def test_week_keys(self):
+        self.assertEqual(list(week_keys(date(2014, 4, 5), date(2014, 4, 13))),
+                         [('2014', '13'), ('2014', '14'), ('2014', '15')])
+
+    def test_matches_probe(self):
+        handler = CollectingHandler()
+        emitter = Emitter()
+        emitter.add_handler(handler)
+        probe = Probe(StubHttp(self.page), emitter)
+        start, end = date(2014, 4, 7), date(2014, 4, 11)
+        count = stream_range(probe, start, end)
+
+        expected = {datum for datum in parse(self.page)
+                    if start <= datum.date <= end}
+        self.assertEqual(handler.values, expected)
+        self.assertEqual(count, len(expected))
+        self.assertEqual(handler.warnings[date(2014, 4, 11)],
+                         warnings(expected, date(2014, 4, 11)))
+
+    def test_whole_dates(self):
+        emitter = MagicMock()
+        probe = Probe(StubHttp(self.page), emitter)
+        start, end = date(2014, 4, 6), date(2014, 4, 12)
+        stream_range(probe, start, end)
+        expected = parse(self.page)
+        calls = emitter.disseminate.call_args_list
+        self.assertEqual([args[0] for args, _ in calls],
+                         sorted({datum.date for datum in expected}))
+        for (day, values), _ in calls:
+            self.assertEqual(len(values), 33)
+            self.assertEqual(values, {datum for datum in expected
+                                      if datum.date == day})
+        batches = emitter.warn_batch.call_args_list
+        self.assertEqual(len(batches), len({args[0] for args, _ in batches}))
+        for (day, found), _ in batches:
+            self.assertEqual(found, warnings(expected, day))
+
+    def test_lazy(self):
+        httplib = MagicMock()
+        httplib.get.return_value.text = self.page
+        emitter = MagicMock()
+        probe = Probe(httplib, emitter)
+        emitter.disseminate.side_effect = [None, Stop]
+        with self.assertRaises(Stop):
+            stream_range(probe, date(2014, 1, 1), date(2014, 12, 31))
+        self.assertEqual(httplib.get.call_count, 1)
+
+    def test_constant_memory(self):
+        emitter = Emitter()
+        emitter.add_handler(NullHandler())
+        probe = Probe(StubHttp(self.page), emitter)
+        peaks = []
+        for weeks in (4, 40):
+            tracemalloc.start()
+            try:
+                pages = fetch(probe.httplib, [('2014', '15')] * weeks)
+                emit(classified(rows(pages)), emitter)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+        self.assertLess(peaks[1], peaks[0] * 1.5)
@@ -1,9 +1,11 @@
 from datetime import date
-from pkg_resources import resource_filename
+from os.path import dirname, join
 import unittest
 
 from pollux import parse, Datum
 
+DATA = join(dirname(__file__), 'data')
+
 
 class TestParser(unittest.TestCase):
 
@@ -11,7 +13,7 @@ class TestParser(unittest.TestCase):
         self.maxDiff = None
 
     def test_parsing(self):
-        fn = resource_filename('pollux', 'test/data/data1.html')
+        fn = join(DATA, 'data1.html')
         with open(fn, encoding='latin1') as fptr:
             html = fptr.read()
         result = parse(html)
@@ -251,7 +253,7 @@ class TestParser(unittest.TestCase):
         self.assertCountEqual(result, expected)
 
     def test_parsing_2(self):
-        fn = resource_filename('pollux', 'test/data/data2.html')
+        fn = join(DATA, 'data2.html')
         with open(fn, encoding='latin1') as fptr:
             html = fptr.read()
         result = parse(html)
@@ -490,3 +492,30 @@ class TestParser(unittest.TestCase):
             Datum(date(2014, 4, 12), 'Tilia', 0),
         }
         self.assertCountEqual(result, expected)
+
+    def test_engines_agree(self):
+        for name in ('data1.html', 'data2.html'):
+            fn = join(DATA, name)
+            with open(fn, encoding='latin1') as fptr:
+                html = fptr.read()
+            self.assertEqual(parse(html, engine='stream'),
+                             parse(html, engine='soup'), name)
+
+    def test_missing_table(self):
+        from pollux.parsing import TableNotFound
+        with self.assertRaises(TableNotFound):
+            parse('<html><table><tr><td>x</td></tr></table></html>')
+
+    def test_stream_unclosed_rows(self):
+        from pollux.parsing import stream_rows, soup_rows
+        html = ('<table></table>' * 5 +
+                '<table><tr><td>a &amp; b</td><td><!-- <td> -->1'
+                '<table><tr><td>2</td></table></td></table>')
+        self.assertEqual(stream_rows(html), soup_rows(html))
+        for table in ('<table><tr><td>q<td/>r</table>',
+                      '<table><tr><td>q</td><td/>r</table>',
+                      '<table><tr><td>a<![CDATA[x<td>y]]>b</td></table>',
+                      '<table><tr><td>a<!DOCTYPE html>b<?pi ?></table>',
+                      '<table/><tr><td>1</td></tr>'):
+            html = '<table></table>' * 5 + table
+            self.assertEqual(stream_rows(html), soup_rows(html), table)
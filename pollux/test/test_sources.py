@@ -0,0 +1,130 @@
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os.path import dirname, join
+from threading import Thread
+from time import perf_counter, sleep
+from unittest.mock import MagicMock
+import unittest
+
+import requests
+
+from pollux import parse
+from pollux.sources import (SOURCES, MultiProbe, PollenLuSource, Source,
+                            get_source)
+
+DATA = join(dirname(__file__), 'data')
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        sleep(self.server.delay)
+        if self.path.startswith('/broken'):
+            self.send_error(500)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=iso-8859-1')
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestMultiProbe(unittest.TestCase):
+
+    def setUp(self):
+        with open(join(DATA, 'data2.html'), 'rb') as fptr:
+            body = fptr.read()
+        self.expected = parse(body.decode('latin1'))
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+        self.server.body = body
+        self.server.paths = []
+        self.server.delay = 0
+        Thread(target=self.server.serve_forever, args=(0.01,),
+               daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def source(self, name):
+        source = PollenLuSource('http://%s:%d/%s' % (
+            self.server.server_address + (name,)))
+        source.name = name
+        return source
+
+    def test_registry(self):
+        self.assertIsInstance(get_source('pollen.lu'), PollenLuSource)
+        self.assertIn('pollen.lu', SOURCES)
+        with self.assertRaises(KeyError):
+            get_source('nope')
+
+    def test_merge(self):
+        day = date(2014, 4, 11)
+        emitter = MagicMock()
+        with MultiProbe(requests, [self.source('a'), self.source('b')],
+                        emitters={'b': emitter}) as probe:
+            count = probe.execute(day)
+        expected = {datum.lname: datum.value for datum in self.expected
+                    if datum.date == day}
+        self.assertEqual(probe.store.get(day), {'a': expected,
+                                                'b': expected})
+        self.assertEqual(count, 2 * len(expected))
+        self.assertEqual(len(probe.store.select('a')), len(expected))
+        emitter.disseminate.assert_called_once_with(
+            day, {datum for datum in self.expected if datum.date == day})
+
+    def test_parallel(self):
+        self.server.delay = 0.3
+        sources = [self.source(name) for name in 'abcd']
+        with MultiProbe(requests, sources) as probe:
+            start = perf_counter()
+            probe.execute(date(2014, 4, 11))
+            elapsed = perf_counter() - start
+        self.assertEqual(len(self.server.paths), 4)
+        self.assertLess(elapsed, 0.9)
+
+    def test_failing_source(self):
+        with MultiProbe(requests, [self.source('a'),
+                                   self.source('broken')]) as probe:
+            probe.execute(date(2014, 4, 11))
+        self.assertEqual(probe.store.sources(), ['a'])
+        self.assertEqual(probe.failures['broken'], 1)
+
+    def test_final_pages_cached(self):
+        with MultiProbe(requests, [self.source('a')],
+                        today=lambda: date(2014, 6, 1)) as probe:
+            self.assertEqual(probe.execute(date(2014, 4, 11)), 33)
+            self.assertEqual(probe.execute(date(2014, 4, 10)), 33)
+            self.assertEqual(probe.execute(date(2014, 4, 11)), 0)
+        self.assertEqual(len(self.server.paths), 1)
+
+    def test_incomplete_source(self):
+        class NoParser(Source):
+            name = 'broken'
+
+            def url(self, key):
+                return 'broken:%s-%s' % key
+
+        with self.assertRaises(TypeError):
+            NoParser()
+
+    def test_custom_source(self):
+        class Static(Source):
+            name = 'static'
+
+            def url(self, key):
+                return 'static:%s-%s' % key
+
+            def parse(self, text):
+                return parse(text)
+
+        httplib = MagicMock()
+        httplib.get.return_value.text = self.server.body.decode('latin1')
+        with MultiProbe(httplib, [Static()]) as probe:
+            probe.execute_range(date(2014, 4, 5), date(2014, 4, 7))
+        self.assertCountEqual([args[0] for args, _ in
+                               httplib.get.call_args_list],
+                              ['static:2014-13', 'static:2014-14'])
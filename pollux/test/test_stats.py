@@ -0,0 +1,111 @@
+from datetime import date, timedelta
+import random
+import unittest
+
+from pollux.emitter import Emitter
+from pollux.model import Datum
+from pollux.stats import PollenStats
+
+
+class TestPollenStats(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(4)
+        self.data = set()
+        day = date(2013, 1, 1)
+        while day <= date(2014, 12, 31):
+            if rng.random() < 0.9:
+                self.data.add(Datum(day, 'Betula', rng.randint(0, 200)))
+            self.data.add(Datum(day, 'Alnus', rng.randint(0, 50)))
+            day += timedelta(days=1)
+        self.stats = PollenStats()
+        self.stats.load(self.data)
+
+    def brute_total(self, genus, start, end):
+        return sum(datum.value for datum in self.data
+                   if datum.lname == genus and start <= datum.date <= end)
+
+    def test_total(self):
+        for start, end in [(date(2013, 1, 1), date(2014, 12, 31)),
+                           (date(2013, 3, 5), date(2013, 3, 5)),
+                           (date(2014, 2, 27), date(2014, 6, 1)),
+                           (date(2010, 1, 1), date(2012, 1, 1))]:
+            self.assertEqual(self.stats.total('Betula', start, end),
+                             self.brute_total('Betula', start, end))
+
+    def test_moving_average(self):
+        end = date(2014, 4, 11)
+        values = [datum.value for datum in self.data
+                  if datum.lname == 'Betula' and
+                  end - timedelta(days=6) <= datum.date <= end]
+        self.assertAlmostEqual(self.stats.moving_average('Betula', end),
+                               sum(values) / len(values))
+        self.assertIsNone(self.stats.moving_average('Betula',
+                                                    date(2000, 1, 1)))
+        series = self.stats.moving_averages('Alnus', date(2014, 4, 1),
+                                            date(2014, 4, 30))
+        self.assertEqual(len(series), 30)
+        self.assertEqual(series[-1], (date(2014, 4, 30),
+                                      self.stats.moving_average(
+                                          'Alnus', date(2014, 4, 30))))
+
+    def test_season_to_date(self):
+        stats = PollenStats(season_start=(2, 1))
+        stats.load(self.data)
+        self.assertEqual(stats.season_to_date('Alnus', date(2014, 1, 15)),
+                         self.brute_total('Alnus', date(2013, 2, 1),
+                                          date(2014, 1, 15)))
+        current, previous = stats.year_over_year('Alnus', date(2014, 3, 1))
+        self.assertEqual(current, self.brute_total(
+            'Alnus', date(2014, 2, 1), date(2014, 3, 1)))
+        self.assertEqual(previous, self.brute_total(
+            'Alnus', date(2013, 2, 1), date(2013, 3, 1)))
+
+    def test_peak(self):
+        rows = [datum for datum in self.data
+                if datum.lname == 'Betula' and datum.date.year == 2014]
+        best = max(rows, key=lambda datum: (datum.value,
+                                            -datum.date.toordinal()))
+        self.assertEqual(self.stats.peak('Betula', 2014),
+                         (best.date, best.value))
+        self.assertIsNone(self.stats.peak('Betula', 2000))
+
+    def test_corrections(self):
+        day = date(2013, 6, 1)
+        stats = PollenStats()
+        stats.load(self.data)
+        stats.load({Datum(day, 'Alnus', 1000)})
+        self.assertEqual(stats.peak('Alnus', 2013), (day, 1000))
+        stats.load({Datum(day, 'Alnus', 0)})
+        self.data = {datum for datum in self.data
+                     if (datum.date, datum.lname) != (day, 'Alnus')}
+        self.data.add(Datum(day, 'Alnus', 0))
+        self.assertEqual(stats.total('Alnus', date(2013, 1, 1),
+                                     date(2014, 12, 31)),
+                         self.brute_total('Alnus', date(2013, 1, 1),
+                                          date(2014, 12, 31)))
+        self.assertNotEqual(stats.peak('Alnus', 2013), (day, 0))
+
+    def test_out_of_order(self):
+        stats = PollenStats()
+        for datum in sorted(self.data, reverse=True):
+            stats.load([datum])
+        self.assertEqual(
+            stats.total('Betula', date(2013, 5, 1), date(2014, 5, 1)),
+            self.stats.total('Betula', date(2013, 5, 1), date(2014, 5, 1)))
+        self.assertEqual(stats.peak('Betula', 2013),
+                         self.stats.peak('Betula', 2013))
+
+    def test_emitter(self):
+        stats = PollenStats()
+        emitter = Emitter()
+        emitter.add_handler(stats)
+        emitter.disseminate(date(2014, 4, 11),
+                            {Datum(date(2014, 4, 11), 'Betula', 117)})
+        self.assertEqual(stats.genera(), ['Betula'])
+        self.assertEqual(stats.moving_average('Betula', date(2014, 4, 12)),
+                         117)
+
+    def test_unknown_genus(self):
+        with self.assertRaises(KeyError):
+            self.stats.total('Nope', date(2014, 1, 1), date(2014, 2, 1))
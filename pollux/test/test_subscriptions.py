@@ -0,0 +1,115 @@
+from datetime import date
+from time import perf_counter
+import random
+import unittest
+
+from pollux.data import THRESHOLDS
+from pollux.emitter import Emitter
+from pollux.model import Datum, SymptomStrength
+from pollux.subscriptions import (LEVELS, DigestDispatcher, SubscriberIndex,
+                                  Subscription)
+
+
+class DigestHandler:
+
+    def __init__(self):
+        self.batches = []
+
+    def handle(self, pollen_family, symptom_strength):
+        pass
+
+    def handle_digests(self, date, digests):
+        self.batches.append((date, digests))
+
+
+class TestSubscriberIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SubscriberIndex()
+        self.index.add(Subscription('a', {'Betula'}, SymptomStrength.LOW))
+        self.index.add(Subscription('b', {'betula', 'alnus'},
+                                    SymptomStrength.HIGH))
+        self.index.add(Subscription('c', None, SymptomStrength.MEDIUM))
+        self.warnings = {'betula': SymptomStrength.HIGH,
+                         'alnus': SymptomStrength.LOW,
+                         'quercus': SymptomStrength.MEDIUM}
+
+    def test_digests(self):
+        self.assertEqual(self.index.digests(self.warnings), {
+            'a': {'betula': SymptomStrength.HIGH},
+            'b': {'betula': SymptomStrength.HIGH},
+            'c': {'betula': SymptomStrength.HIGH,
+                  'quercus': SymptomStrength.MEDIUM},
+        })
+
+    def test_replace_and_remove(self):
+        self.index.add(Subscription('a', {'alnus'}, SymptomStrength.LOW))
+        self.index.remove('c')
+        self.assertEqual(self.index.digests(self.warnings), {
+            'a': {'alnus': SymptomStrength.LOW},
+            'b': {'betula': SymptomStrength.HIGH},
+        })
+        self.assertEqual(len(self.index), 2)
+
+    def test_invalid_strength(self):
+        with self.assertRaises(ValueError):
+            self.index.add(Subscription('d', None, SymptomStrength.UNKNOWN))
+
+    def test_matches_filtering(self):
+        rng = random.Random(3)
+        genera = sorted(THRESHOLDS)
+        subscriptions = [
+            Subscription(number, set(rng.sample(genera, rng.randint(1, 4))),
+                         rng.choice(LEVELS))
+            for number in range(500)]
+        index = SubscriberIndex()
+        for subscription in subscriptions:
+            index.add(subscription)
+        found = {genus: rng.choice(LEVELS) for genus in genera}
+        expected = {}
+        for subscription in subscriptions:
+            digest = {genus: strength for genus, strength in found.items()
+                      if genus in subscription.genera and
+                      LEVELS.index(strength) >=
+                      LEVELS.index(subscription.strength)}
+            if digest:
+                expected[subscription.subscriber] = digest
+        self.assertEqual(index.digests(found), expected)
+
+
+class TestDigestDispatcher(unittest.TestCase):
+
+    def test_dispatch(self):
+        index = SubscriberIndex()
+        for number in range(25):
+            index.add(Subscription(number, None, SymptomStrength.LOW))
+        handler = DigestHandler()
+        digest_emitter = Emitter()
+        digest_emitter.add_handler(handler)
+        emitter = Emitter()
+        emitter.add_handler(DigestDispatcher(index, digest_emitter,
+                                             batch_size=10))
+        day = date(2014, 4, 11)
+        emitter.disseminate(day, {Datum(day, 'Betula', 117)})
+        self.assertEqual([len(digests) for _, digests in handler.batches],
+                         [10, 10, 5])
+        self.assertEqual(handler.batches[0][1][0][1],
+                         {'betula': SymptomStrength.HIGH})
+
+    def test_many_subscribers(self):
+        rng = random.Random(5)
+        genera = sorted(THRESHOLDS)
+        index = SubscriberIndex()
+        for number in range(100000):
+            index.add(Subscription(
+                number, rng.sample(genera, 3), rng.choice(LEVELS)))
+        handler = DigestHandler()
+        emitter = Emitter()
+        emitter.add_handler(handler)
+        found = {genus: SymptomStrength.HIGH for genus in genera}
+        start = perf_counter()
+        count = DigestDispatcher(index, emitter).dispatch(date.today(),
+                                                          found)
+        self.assertEqual(count, 100000)
+        self.assertLess(perf_counter() - start, 5)
+        self.assertEqual(len(handler.batches), 100)
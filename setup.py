@@ -1,8 +1,13 @@
+from os.path import dirname, join
+
 from setuptools import setup, find_packages
-from pkg_resources import resource_string
+
+with open(join(dirname(__file__), 'pollux', 'version.txt')) as fptr:
+    VERSION = fptr.read().strip()
+
 setup(
     name="pollux",
-    version=resource_string('pollux', 'version.txt').decode('ascii').strip(),
+    version=VERSION,
     packages=find_packages(),
     install_requires=[
         'beautifulsoup4',
@@ -10,6 +15,11 @@ setup(
         'requests',
     ],
     include_package_data=True,
+    entry_points={
+        'console_scripts': [
+            'pollux=pollux.cli:main',
+        ],
+    },
     author="Michel Albert",
     author_email="michel@albert.lu",
     description="Pollen alert service for Luxembourg",